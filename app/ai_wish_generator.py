@@ -1,14 +1,20 @@
 """
 AI-powered anniversary wish generator service.
 """
+import asyncio
 import logging
 import random
 import re
+import time
 import uuid
 import hashlib
 from datetime import datetime
-from typing import Optional, Dict, Any, List
-from groq import Groq
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple, Final
+from cachetools import TTLCache
+import httpx
+import groq
+from groq import AsyncGroq
 import openai
 
 from app.config import settings
@@ -17,32 +23,393 @@ from app.database import db_manager
 
 logger = logging.getLogger(__name__)
 
+# Transient failures worth retrying; auth and bad-request errors are not
+_RETRYABLE_ERRORS = (
+    groq.APITimeoutError,
+    groq.APIConnectionError,
+    groq.RateLimitError,
+    groq.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+# Common relationship mappings
+_RELATIONSHIP_CONTEXTS: Final[Dict[str, str]] = {
+    "spouse": "as their loving spouse",
+    "husband": "as their loving husband",
+    "wife": "as their loving wife",
+    "partner": "as their loving partner",
+    "parent": "as their parent",
+    "mother": "as their mother",
+    "father": "as their father",
+    "child": "as their child",
+    "son": "as their son",
+    "daughter": "as their daughter",
+    "sibling": "as their sibling",
+    "brother": "as their brother",
+    "sister": "as their sister",
+    "friend": "as their dear friend",
+    "colleague": "as their colleague",
+    "coworker": "as their coworker",
+    "relative": "as their family member",
+    "family": "as their family member",
+    "mentor": "as their mentor",
+    "teacher": "as their teacher",
+    "boss": "as their boss",
+    "manager": "as their manager",
+    "neighbor": "as their neighbor",
+    "pastor": "as their pastor",
+    "minister": "as their minister"
+}
+
+# Partial-match indexes over the relationship keys: a lookahead alternation
+# finds every key contained in the input in one scan, and a substring table
+# answers "input contained in a key" with a single dict probe
+_RELATIONSHIP_KEYS = tuple(_RELATIONSHIP_CONTEXTS)
+_RELATIONSHIP_PRIORITY = {key: index for index, key in enumerate(_RELATIONSHIP_KEYS)}
+_RELATIONSHIP_KEY_RE = re.compile("(?=(" + "|".join(map(re.escape, _RELATIONSHIP_KEYS)) + "))")
+
+
+def _build_substring_priority(keys: Tuple[str, ...]) -> Dict[str, int]:
+    """Map every substring of every key to the index of the first key containing it."""
+    priority: Dict[str, int] = {}
+    for index, key in enumerate(keys):
+        for start in range(len(key) + 1):
+            for end in range(start, len(key) + 1):
+                priority.setdefault(key[start:end], index)
+    return priority
+
+
+_RELATIONSHIP_SUBSTRING_PRIORITY = _build_substring_priority(_RELATIONSHIP_KEYS)
+
+_ANNIVERSARY_TYPE_CONTEXTS: Final[Dict[AnniversaryType, str]] = {
+    AnniversaryType.BIRTHDAY: "birthday",
+    AnniversaryType.WORK_ANNIVERSARY: "work anniversary",
+    AnniversaryType.WEDDING_ANNIVERSARY: "wedding anniversary",
+    AnniversaryType.PROMOTION: "promotion celebration",
+    AnniversaryType.RETIREMENT: "retirement celebration",
+    AnniversaryType.FRIENDSHIP: "friendship anniversary",
+    AnniversaryType.RELATIONSHIP: "relationship anniversary",
+    AnniversaryType.MILESTONE: "milestone anniversary",
+    AnniversaryType.CUSTOM: "special anniversary"
+}
+
+_TONE_INSTRUCTIONS: Final[Dict[ToneType, str]] = {
+    ToneType.PROFESSIONAL: "Use a professional, respectful tone appropriate for workplace relationships. Keep it formal but warm.",
+    ToneType.FRIENDLY: "Use a friendly, approachable tone. Be warm and personable while maintaining respect.",
+    ToneType.WARM: "Use a warm, heartfelt tone. Express genuine care and affection in your message.",
+    ToneType.HUMOROUS: "Use a light, humorous tone with appropriate jokes or playful language. Keep it tasteful and respectful.",
+    ToneType.FORMAL: "Use a formal, dignified tone. Be respectful and proper while still being celebratory."
+}
+
+# Short inspirational lines appended to fallback wishes
+_INSPIRATIONAL_LINES: Final[Tuple[str, ...]] = (
+    "Here’s to many more moments worth celebrating.",
+    "Wishing you continued joy, growth, and laughter together.",
+    "May the years ahead be full of memorable adventures.",
+    "Cheers to milestones behind you and the ones still to come.",
+    "Your dedication and care for each other truly shine.",
+)
+
+# Fallback wish templates per anniversary type, ending with an inspirational line
+_GENERIC_FALLBACK_TEMPLATE = "🎉 Happy {occasion}, {name}! Cheers to all the moments ahead. {line}"
+_FALLBACK_TEMPLATES = {
+    AnniversaryType.BIRTHDAY: "🎂 Happy Birthday, {name}! Wishing you a year filled with good health, happiness, and moments that make you smile. {line}",
+    AnniversaryType.PROMOTION: "🎉 Congratulations on your promotion, {name}! Your hard work and dedication truly stand out—here's to new challenges and continued success. {line}",
+    AnniversaryType.RETIREMENT: "🎊 Congratulations on your retirement, {name}! May this new chapter bring you relaxation, discovery, and time for everything you enjoy. {line}",
+    AnniversaryType.WORK_ANNIVERSARY: "🎉 Happy work anniversary, {name}! Thank you for your contributions and collaboration—here's to another year of impact. {line}",
+    AnniversaryType.WEDDING_ANNIVERSARY: _GENERIC_FALLBACK_TEMPLATE,
+    AnniversaryType.RELATIONSHIP: _GENERIC_FALLBACK_TEMPLATE,
+    AnniversaryType.FRIENDSHIP: _GENERIC_FALLBACK_TEMPLATE,
+    AnniversaryType.MILESTONE: _GENERIC_FALLBACK_TEMPLATE,
+    AnniversaryType.CUSTOM: _GENERIC_FALLBACK_TEMPLATE,
+}
+_DEFAULT_FALLBACK_TEMPLATE = "🎉 Happy {occasion}, {name}! Wishing you continued joy and meaningful moments. {line}"
+
+# Boilerplate stripped from AI output, fused into one anchored pattern per stage
+_INTRO_PATTERNS = [
+    r"here(?:'| i)s (?:a|one) (?:warm|personal(?:ized)?) anniversary wish for [^:]+:\s*",
+    r"here(?:'| i)s (?:a|one) (?:non\-religious )?anniversary wish:\s*",
+]
+_CLOSING_PATTERNS = [
+    r"congratulations again\.?",
+    r"best wishes\.?",
+    r"cheers\.?",
+]
+_INTRO_RE = re.compile(r"^\s*(?:" + "|".join(_INTRO_PATTERNS) + ")", re.IGNORECASE)
+_CLOSING_RE = re.compile("(?:(?:" + "|".join(_CLOSING_PATTERNS) + r")\s*)+$", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+# System messages for each provider, shared by every request
+_GROQ_SYSTEM_MESSAGE: Final[Dict[str, str]] = {
+    "role": "system",
+    "content": "You write personalized anniversary wishes. Your messages should be warm and appropriate for the occasion. Return ONLY the wish content without any introductory or closing text."
+}
+_OPENAI_SYSTEM_MESSAGE: Final[Dict[str, str]] = {
+    "role": "system",
+    "content": "You write personalized anniversary wishes. Return ONLY the wish content without any introductory or closing text."
+}
+
+# User prompts for each provider; {context_line} is empty when no context is given
+_GROQ_PROMPT_TEMPLATE = (
+    "Generate a {anniversary} wish for {name}.\n"
+    "Write this {relationship}.\n"
+    "Tone: {tone}\n"
+    "{context_line}"
+    "The wish should:\n"
+    "- Be heartfelt and genuine\n"
+    "- Be appropriate for the occasion\n"
+    "- Be 2-4 sentences long\n"
+    "Format: [Wish Message]"
+)
+_OPENAI_PROMPT_TEMPLATE = (
+    "Generate a {anniversary} wish for {name}.\n"
+    "Write this {relationship}.\n"
+    "Tone: {tone}\n"
+    "{context_line}"
+    "The wish should be heartfelt, and be appropriate for the occasion.\n"
+    "Keep it to 2-4 sentences. Format: [Wish Message]"
+)
+
+
+def _build_prompt(template: str, name: str, anniversary: str, relationship: str,
+                  tone: str, context: Optional[str]) -> str:
+    """Fill a prompt template in a single formatting step."""
+    return template.format(
+        name=name,
+        anniversary=anniversary,
+        relationship=relationship,
+        tone=tone,
+        context_line=f"Additional context: {context}\n" if context else "",
+    )
+
+
+# Regenerations keep only the most recent context snippets so prompts stay bounded
+_CONTEXT_SEPARATOR = " | "
+_MAX_PRIOR_CONTEXT_PARTS = 3
+_MAX_CONTEXT_LENGTH = 500
+
+
+def _merge_context(context: Optional[str], additional_context: str) -> str:
+    """Append a regeneration snippet to the recent context, within the request's length limit."""
+    parts = [part.strip() for part in (context or "").split(_CONTEXT_SEPARATOR) if part.strip()]
+    parts = parts[-_MAX_PRIOR_CONTEXT_PARTS:]
+    parts.append(additional_context.strip())
+
+    merged = _CONTEXT_SEPARATOR.join(parts)
+    while len(merged) > _MAX_CONTEXT_LENGTH and len(parts) > 1:
+        parts.pop(0)
+        merged = _CONTEXT_SEPARATOR.join(parts)
+    return merged[:_MAX_CONTEXT_LENGTH]
+
+
+@lru_cache(maxsize=4096)
+def _hash_ip_address(ip_address: str) -> str:
+    """Hash an IP address; bounded memo since the same clients recur."""
+    return hashlib.blake2b(ip_address.encode(), digest_size=8).hexdigest()
+
 
 class AIWishGenerator:
     """Generates personalized anniversary wishes using AI."""
 
     def __init__(self):
-        """Initialize AI clients."""
-        self.groq_client = None
-        self.openai_client = None
+        """Initialize generator state; AI clients are created on first use."""
+        self._groq_client: Optional[AsyncGroq] = None
+        self._openai_client: Optional[openai.AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        # Successful AI wishes keyed on the normalized request, plus the
+        # in-flight generation per key so concurrent duplicates share one LLM call
+        self._wish_cache: TTLCache = TTLCache(
+            maxsize=settings.wish_cache_size, ttl=settings.wish_cache_ttl_seconds
+        )
+        self._wish_inflight: Dict[tuple, asyncio.Task] = {}
+        # Groq circuit breaker: consecutive failures and when to allow a probe
+        self._groq_failures = 0
+        self._groq_open_until = 0.0
+        # Caps in-flight Groq calls so bursts queue for warm pooled connections
+        # instead of opening new ones and tripping provider rate limits
+        self._groq_semaphore = asyncio.Semaphore(max(1, settings.groq_max_concurrency))
+        # Audit rows are queued and written in batches by a background task
+        self._audit_queue: Optional[asyncio.Queue] = None
+        self._audit_writer_task: Optional[asyncio.Task] = None
+        # Queued rows by request id until written, so regenerate can find them
+        self._pending_audit: Dict[str, AIWishAuditLogCreate] = {}
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the connection pool shared by both AI clients, creating it on first use."""
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.ai_http_max_connections,
+                    max_keepalive_connections=settings.ai_http_max_keepalive_connections,
+                ),
+                timeout=max(settings.groq_timeout, settings.openai_timeout),
+            )
+        return self._http_client
 
-        # Initialize Groq client
-        if settings.groq_api_key:
+    @property
+    def groq_client(self) -> Optional[AsyncGroq]:
+        """Groq client, created on first use."""
+        if self._groq_client is None and settings.groq_api_key:
             try:
-                self.groq_client = Groq(api_key=settings.groq_api_key)
+                self._groq_client = AsyncGroq(
+                    api_key=settings.groq_api_key, max_retries=0, http_client=self._get_http_client()
+                )
             except Exception as e:
-                logger.warning(f"Failed to initialize Groq client: {e}")
+                logger.warning("Failed to initialize Groq client: %s", e)
+        return self._groq_client
+
+    @groq_client.setter
+    def groq_client(self, client: Optional[AsyncGroq]) -> None:
+        self._groq_client = client
 
-        # Initialize OpenAI client as fallback
-        if settings.openai_api_key:
+    @property
+    def openai_client(self) -> Optional[openai.AsyncOpenAI]:
+        """OpenAI client, created on first use."""
+        if self._openai_client is None and settings.openai_api_key:
             try:
-                self.openai_client = openai.OpenAI(api_key=settings.openai_api_key)
+                self._openai_client = openai.AsyncOpenAI(
+                    api_key=settings.openai_api_key, max_retries=0, http_client=self._get_http_client()
+                )
             except Exception as e:
-                logger.warning(f"Failed to initialize OpenAI client: {e}")
+                logger.warning("Failed to initialize OpenAI client: %s", e)
+        return self._openai_client
+
+    @openai_client.setter
+    def openai_client(self, client: Optional[openai.AsyncOpenAI]) -> None:
+        self._openai_client = client
+
+    def start(self) -> None:
+        """Start the background audit writer.
+
+        With several worker processes the writer stays off and audit rows are
+        written before the response, so a regenerate handled by another
+        worker can find the original request in the database.
+        """
+        if self._audit_writer_task is None and settings.web_concurrency <= 1:
+            self._audit_queue = asyncio.Queue(maxsize=settings.audit_queue_maxsize)
+            self._audit_writer_task = asyncio.create_task(self._run_audit_writer())
+
+    async def aclose(self) -> None:
+        """Flush pending audit rows, then close the AI clients and their connection pool."""
+        if self._audit_writer_task is not None:
+            # A None sentinel tells the writer to flush what it has and exit
+            await self._audit_queue.put(None)
+            await self._audit_writer_task
+            self._audit_writer_task = None
+            self._audit_queue = None
+
+        self._groq_client = None
+        self._openai_client = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def _create_completion(self, client, timeout: float, **kwargs):
+        """Create a chat completion, retrying transient errors with jittered backoff."""
+        attempts = max(1, settings.ai_max_attempts)
+        for attempt in range(attempts):
+            try:
+                return await client.chat.completions.create(timeout=timeout, **kwargs)
+            except _RETRYABLE_ERRORS as e:
+                if attempt == attempts - 1:
+                    raise
+                delay = min(0.25 * 2 ** attempt + random.random() * 0.1, 2.0)
+                logger.warning("Transient AI error (attempt %d), retrying in %.2fs: %s", attempt + 1, delay, e)
+                await asyncio.sleep(delay)
+
+    def _groq_circuit_allows_call(self) -> bool:
+        """Return False while the Groq circuit is open; let one probe through once it half-opens."""
+        if self._groq_failures < settings.groq_circuit_failure_threshold:
+            return True
+
+        now = time.monotonic()
+        if now < self._groq_open_until:
+            return False
+
+        # Half-open: push the window out so only this call probes Groq
+        self._groq_open_until = now + settings.groq_circuit_reset_seconds
+        return True
+
+    def _record_groq_result(self, success: bool) -> None:
+        """Update the Groq circuit breaker after a call."""
+        if success:
+            self._groq_failures = 0
+            self._groq_open_until = 0.0
+            return
+
+        self._groq_failures += 1
+        if self._groq_failures >= settings.groq_circuit_failure_threshold:
+            self._groq_open_until = time.monotonic() + settings.groq_circuit_reset_seconds
+            logger.warning("Groq circuit open after %d consecutive failures", self._groq_failures)
+
+    async def _run_audit_writer(self) -> None:
+        """Drain the audit queue, writing up to a batch per flush interval."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._audit_queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = loop.time() + settings.audit_flush_interval_seconds
+            while len(batch) < settings.audit_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._audit_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._write_audit_batch(batch)
+
+    async def _write_audit_batch(self, batch: List[AIWishAuditLogCreate]) -> None:
+        """Write a batch of audit rows, retrying before falling back to row-by-row inserts."""
+        try:
+            attempts = max(1, settings.audit_write_max_attempts)
+            for attempt in range(attempts):
+                try:
+                    await db_manager.bulk_log_ai_wish_requests(batch)
+                    logger.info("Audit trail logged for %d requests", len(batch))
+                    return
+                except Exception as e:
+                    logger.warning(
+                        "Failed to write %d audit log entries (attempt %d): %s", len(batch), attempt + 1, e
+                    )
+                    if attempt < attempts - 1:
+                        await asyncio.sleep(min(0.5 * 2 ** attempt, 5.0))
+
+            # One bad row shouldn't cost the rest of the batch
+            for audit_data in batch:
+                try:
+                    await db_manager.log_ai_wish_request(audit_data)
+                except Exception as e:
+                    logger.error("Failed to log audit trail for request %s: %s", audit_data.request_id, e)
+        finally:
+            for audit_data in batch:
+                self._pending_audit.pop(audit_data.request_id, None)
+
+    def get_pending_audit_entry(self, request_id: str,
+                                owner_user_id: Optional[int] = None) -> Optional[AIWishAuditLogCreate]:
+        """Return a queued audit entry that hasn't been written yet, scoped like the DB lookup."""
+        audit_data = self._pending_audit.get(request_id)
+        if audit_data is None:
+            return None
+        if owner_user_id is not None and audit_data.owner_user_id != owner_user_id:
+            return None
+        return audit_data
 
     def _hash_ip_address(self, ip_address: str) -> str:
         """Hash IP address for privacy while maintaining uniqueness."""
-        return hashlib.sha256(ip_address.encode()).hexdigest()[:16]
+        return _hash_ip_address(ip_address)
 
     async def _log_audit_trail(self, request_id: str, original_request_id: Optional[str],
                               ip_address: str, request: AnniversaryWishRequest,
@@ -62,187 +429,138 @@ class AIWishGenerator:
                 request_id=request_id,
                 original_request_id=original_request_id,
                 ip_address=hashed_ip,
-                request_data=request.dict(),
+                request_data=request.model_dump(),
                 response_data={"generated_wish": response},
                 ai_service_used=ai_service_used
             )
             
-            # Log to database
+            # Hand off to the batch writer; write directly if it isn't running
+            # or is too far behind
+            if self._audit_queue is not None:
+                try:
+                    self._audit_queue.put_nowait(audit_data)
+                    self._pending_audit[request_id] = audit_data
+                    return
+                except asyncio.QueueFull:
+                    logger.warning("Audit queue full, writing request %s directly", request_id)
+
             await db_manager.log_ai_wish_request(audit_data)
-            logger.info(f"Audit trail logged for request {request_id}")
+            logger.info("Audit trail logged for request %s", request_id)
             
         except Exception as e:
-            logger.error(f"Failed to log audit trail for request {request_id}: {e}")
+            logger.error("Failed to log audit trail for request %s: %s", request_id, e)
             # Don't raise exception - audit logging failure shouldn't break the main flow
 
-    def get_inspirational_lines(self) -> List[str]:
+    def get_inspirational_lines(self) -> Tuple[str, ...]:
         """Short inspirational lines you can optionally append to a wish."""
-        return [
-        "Here’s to many more moments worth celebrating.",
-        "Wishing you continued joy, growth, and laughter together.",
-        "May the years ahead be full of memorable adventures.",
-        "Cheers to milestones behind you and the ones still to come.",
-        "Your dedication and care for each other truly shine.",
-        ]
-    
-    def get_relationship_context(self, relationship: str) -> str:
+        return _INSPIRATIONAL_LINES
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def get_relationship_context(relationship: str) -> str:
         """Get contextual information based on relationship type."""
         # Convert to lowercase for case-insensitive matching
         relationship_lower = relationship.lower().strip()
-        
-        # Common relationship mappings
-        relationship_contexts = {
-            "spouse": "as their loving spouse",
-            "husband": "as their loving husband",
-            "wife": "as their loving wife",
-            "partner": "as their loving partner",
-            "parent": "as their parent",
-            "mother": "as their mother",
-            "father": "as their father",
-            "child": "as their child",
-            "son": "as their son",
-            "daughter": "as their daughter",
-            "sibling": "as their sibling",
-            "brother": "as their brother",
-            "sister": "as their sister",
-            "friend": "as their dear friend",
-            "colleague": "as their colleague",
-            "coworker": "as their coworker",
-            "relative": "as their family member",
-            "family": "as their family member",
-            "mentor": "as their mentor",
-            "teacher": "as their teacher",
-            "boss": "as their boss",
-            "manager": "as their manager",
-            "neighbor": "as their neighbor",
-            "pastor": "as their pastor",
-            "minister": "as their minister"
-        }
-        
+
         # Check for exact matches first
-        if relationship_lower in relationship_contexts:
-            return relationship_contexts[relationship_lower]
-        
-        # Check for partial matches
-        for key, value in relationship_contexts.items():
-            if key in relationship_lower or relationship_lower in key:
-                return value
-        
+        if relationship_lower in _RELATIONSHIP_CONTEXTS:
+            return _RELATIONSHIP_CONTEXTS[relationship_lower]
+
+        # Check for partial matches, preferring keys in declaration order
+        best = _RELATIONSHIP_SUBSTRING_PRIORITY.get(relationship_lower, len(_RELATIONSHIP_KEYS))
+        for match in _RELATIONSHIP_KEY_RE.finditer(relationship_lower):
+            best = min(best, _RELATIONSHIP_PRIORITY[match.group(1)])
+        if best < len(_RELATIONSHIP_KEYS):
+            return _RELATIONSHIP_CONTEXTS[_RELATIONSHIP_KEYS[best]]
+
         # Default fallback - use the relationship as provided
         return f"as their {relationship}"
 
-    def get_anniversary_type_context(self, anniversary_type: AnniversaryType) -> str:
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def get_anniversary_type_context(anniversary_type: AnniversaryType) -> str:
         """Get contextual information based on anniversary type."""
-        type_contexts = {
-            AnniversaryType.BIRTHDAY: "birthday",
-            AnniversaryType.WORK_ANNIVERSARY: "work anniversary",
-            AnniversaryType.WEDDING_ANNIVERSARY: "wedding anniversary",
-            AnniversaryType.PROMOTION: "promotion celebration",
-            AnniversaryType.RETIREMENT: "retirement celebration",
-            AnniversaryType.FRIENDSHIP: "friendship anniversary",
-            AnniversaryType.RELATIONSHIP: "relationship anniversary",
-            AnniversaryType.MILESTONE: "milestone anniversary",
-            AnniversaryType.CUSTOM: "special anniversary"
-        }
-        return type_contexts.get(anniversary_type, "anniversary")
-
-    def get_tone_instructions(self, tone: ToneType) -> str:
+        return _ANNIVERSARY_TYPE_CONTEXTS.get(anniversary_type, "anniversary")
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def get_tone_instructions(tone: ToneType) -> str:
         """Get tone-specific instructions for wish generation."""
-        tone_instructions = {
-            ToneType.PROFESSIONAL: "Use a professional, respectful tone appropriate for workplace relationships. Keep it formal but warm.",
-            ToneType.FRIENDLY: "Use a friendly, approachable tone. Be warm and personable while maintaining respect.",
-            ToneType.WARM: "Use a warm, heartfelt tone. Express genuine care and affection in your message.",
-            ToneType.HUMOROUS: "Use a light, humorous tone with appropriate jokes or playful language. Keep it tasteful and respectful.",
-            ToneType.FORMAL: "Use a formal, dignified tone. Be respectful and proper while still being celebratory."
-        }
-        return tone_instructions.get(tone, "Use a warm, heartfelt tone.")
-
-    async def generate_wish_with_groq(self, request: AnniversaryWishRequest) -> Optional[str]:
+        return _TONE_INSTRUCTIONS.get(tone, "Use a warm, heartfelt tone.")
+
+    def _build_contexts(self, request: AnniversaryWishRequest) -> Tuple[str, str, str]:
+        """Resolve the relationship, anniversary-type and tone prompt fragments for a request."""
+        return (
+            self.get_relationship_context(request.relationship),
+            self.get_anniversary_type_context(request.anniversary_type),
+            self.get_tone_instructions(request.tone),
+        )
+
+    async def generate_wish_with_groq(self, request: AnniversaryWishRequest,
+                                       contexts: Optional[Tuple[str, str, str]] = None) -> Optional[str]:
         """Generate anniversary wish using Groq API."""
-        if not self.groq_client:
+        if not self.groq_client or not self._groq_circuit_allows_call():
             return None
 
         try:
-            relationship_context = self.get_relationship_context(request.relationship)
-            anniversary_context = self.get_anniversary_type_context(request.anniversary_type)
-            tone_instructions = self.get_tone_instructions(request.tone)
-            
-            # Build the prompt
-            prompt_parts = [
-                f"Generate a {anniversary_context} wish for {request.name}.",
-                f"Write this {relationship_context}.",
-                f"Tone: {tone_instructions}",
-            ]
-            
-            if request.context:
-                prompt_parts.append(f"Additional context: {request.context}")
-            
-            prompt_parts.extend([
-                "The wish should:",
-                "- Be heartfelt and genuine",
-                "- Be appropriate for the occasion",
-                "- Be 2-4 sentences long",
-                "Format: [Wish Message]"
-            ])
+            relationship_context, anniversary_context, tone_instructions = (
+                contexts or self._build_contexts(request)
+            )
             
-            prompt = "\n".join(prompt_parts)
-
-            response = self.groq_client.chat.completions.create(
-                model=settings.groq_model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You write personalized anniversary wishes. Your messages should be warm and appropriate for the occasion. Return ONLY the wish content without any introductory or closing text."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0.7
+            prompt = _build_prompt(
+                _GROQ_PROMPT_TEMPLATE,
+                request.name,
+                anniversary_context,
+                relationship_context,
+                tone_instructions,
+                request.context,
             )
 
+            async with self._groq_semaphore:
+                response = await self._create_completion(
+                    self.groq_client,
+                    settings.groq_timeout,
+                    model=settings.groq_model,
+                    messages=[_GROQ_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+                    max_tokens=300,
+                    temperature=0.7
+                )
+
             message = response.choices[0].message.content.strip()
-            return self._clean_ai_message(message)
+            wish = self._clean_ai_message(message)
+            self._record_groq_result(bool(wish))
+            return wish
 
         except Exception as e:
-            logger.error(f"Error generating wish with Groq: {e}")
+            logger.error("Error generating wish with Groq: %s", e)
+            self._record_groq_result(False)
             return None
 
-    async def generate_wish_with_openai(self, request: AnniversaryWishRequest) -> Optional[str]:
+    async def generate_wish_with_openai(self, request: AnniversaryWishRequest,
+                                       contexts: Optional[Tuple[str, str, str]] = None) -> Optional[str]:
         """Generate anniversary wish using OpenAI API as fallback."""
         if not self.openai_client:
             return None
 
         try:
-            relationship_context = self.get_relationship_context(request.relationship)
-            anniversary_context = self.get_anniversary_type_context(request.anniversary_type)
-            tone_instructions = self.get_tone_instructions(request.tone)
-            
-            # Build the prompt
-            prompt_parts = [
-                f"Generate a {anniversary_context} wish for {request.name}.",
-                f"Write this {relationship_context}.",
-                f"Tone: {tone_instructions}",
-            ]
-            
-            if request.context:
-                prompt_parts.append(f"Additional context: {request.context}")
-            
-            prompt_parts.extend([
-                "The wish should be heartfelt, and be appropriate for the occasion.",
-                "Keep it to 2-4 sentences. Format: [Wish Message]"
-            ])
+            relationship_context, anniversary_context, tone_instructions = (
+                contexts or self._build_contexts(request)
+            )
             
-            prompt = "\n".join(prompt_parts)
+            prompt = _build_prompt(
+                _OPENAI_PROMPT_TEMPLATE,
+                request.name,
+                anniversary_context,
+                relationship_context,
+                tone_instructions,
+                request.context,
+            )
 
-            response = self.openai_client.chat.completions.create(
+            response = await self._create_completion(
+                self.openai_client,
+                settings.openai_timeout,
                 model=settings.openai_model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You write personalized anniversary wishes. Return ONLY the wish content without any introductory or closing text."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
+                messages=[_OPENAI_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
                 max_tokens=300,
                 temperature=0.7
             )
@@ -251,76 +569,119 @@ class AIWishGenerator:
             return self._clean_ai_message(message)
 
         except Exception as e:
-            logger.error(f"Error generating wish with OpenAI: {e}")
+            logger.error("Error generating wish with OpenAI: %s", e)
             return None
 
     def generate_fallback_wish(self, request: AnniversaryWishRequest) -> str:
         """Generate a fallback wish when AI services are unavailable."""
-        relationship_context = self.get_relationship_context(request.relationship)
         anniversary_context = self.get_anniversary_type_context(request.anniversary_type)
-        
-        # Generate base message based on anniversary type
-        # Build a simple, tasteful, non‑religious message per type
-        if request.anniversary_type == AnniversaryType.BIRTHDAY:
-            base = f"🎂 Happy Birthday, {request.name}! Wishing you a year filled with good health, happiness, and moments that make you smile."
-        elif request.anniversary_type == AnniversaryType.PROMOTION:
-            base = f"🎉 Congratulations on your promotion, {request.name}! Your hard work and dedication truly stand out—here's to new challenges and continued success."
-        elif request.anniversary_type == AnniversaryType.RETIREMENT:
-            base = f"🎊 Congratulations on your retirement, {request.name}! May this new chapter bring you relaxation, discovery, and time for everything you enjoy."
-        elif request.anniversary_type in {AnniversaryType.WEDDING_ANNIVERSARY, AnniversaryType.RELATIONSHIP, AnniversaryType.FRIENDSHIP, AnniversaryType.MILESTONE, AnniversaryType.CUSTOM}:
-            base = f"🎉 Happy {anniversary_context.title()}, {request.name}! Cheers to all the moments ahead."
-        elif request.anniversary_type == AnniversaryType.WORK_ANNIVERSARY:
-            base = f"🎉 Happy work anniversary, {request.name}! Thank you for your contributions and collaboration—here's to another year of impact."
-        else:
-            base = f"🎉 Happy {anniversary_context.title()}, {request.name}! Wishing you continued joy and meaningful moments."
 
-        # Add a random inspirational line
-        inspirational_line = random.choice(self.get_inspirational_lines())
-        message = f"{base} {inspirational_line}"
-
-        return message
+        # Build a simple, tasteful, non‑religious message per type, with a
+        # random inspirational line, in a single formatting step
+        template = _FALLBACK_TEMPLATES.get(request.anniversary_type, _DEFAULT_FALLBACK_TEMPLATE)
+        return template.format(
+            name=request.name,
+            occasion=anniversary_context.title(),
+            line=random.choice(_INSPIRATIONAL_LINES),
+        )
 
     def _clean_ai_message(self, message: str) -> str:
         """Clean AI‑generated message by removing boilerplate."""
-        intro_patterns = [
-        r"here(?:'| i)s (?:a|one) (?:warm|personal(?:ized)?) anniversary wish for [^:]+:\s*",
-        r"here(?:'| i)s (?:a|one) (?:non\-religious )?anniversary wish:\s*",
-        ]
-        
-        for pattern in intro_patterns:
-            message = re.sub(pattern, "", message, flags=re.IGNORECASE).strip()
-
-
-        closing_patterns = [
-        r"congratulations again\.?$",
-        r"best wishes\.?$",
-        r"cheers\.?$",
-        ]
-        for pattern in closing_patterns:
-            message = re.sub(pattern, "", message, flags=re.IGNORECASE).strip()
-
-
-        message = re.sub(r"\n+", " ", message)
-        message = re.sub(r"\s+", " ", message)
-        
+        message = _INTRO_RE.sub("", message, count=1).strip()
+        message = _CLOSING_RE.sub("", message, count=1).strip()
+
+        # \s covers newlines, so one pass normalizes all whitespace
+        message = _WS_RE.sub(" ", message)
+
         return message.strip()
 
+    async def _generate_with_hedging(self, request: AnniversaryWishRequest) -> Tuple[Optional[str], str]:
+        """Race Groq against a delayed OpenAI request and return the first usable wish."""
+        # Resolved once and shared by both providers
+        contexts = self._build_contexts(request)
+        groq_task = asyncio.create_task(self.generate_wish_with_groq(request, contexts))
+        tasks = {groq_task: "groq"}
+
+        try:
+            # Give Groq a head start; only hedge with OpenAI if it is slow or fails
+            await asyncio.wait({groq_task}, timeout=settings.ai_hedge_delay_seconds)
+            if groq_task.done() and groq_task.result():
+                return groq_task.result(), "groq"
+
+            if self.openai_client:
+                tasks[asyncio.create_task(self.generate_wish_with_openai(request, contexts))] = "openai"
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    wish = task.result()
+                    if wish:
+                        return wish, tasks[task]
+
+            return None, "fallback"
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _wish_cache_key(request: AnniversaryWishRequest) -> tuple:
+        """Build a cache key from the normalized request fields."""
+        # The wish repeats the name as typed, so its case must stay in the key
+        return (
+            request.name.strip(),
+            request.anniversary_type,
+            request.relationship.strip().lower(),
+            request.tone,
+            (request.context or "").strip(),
+        )
+
+    async def _generate_cached(self, request: AnniversaryWishRequest) -> Tuple[Optional[str], str]:
+        """Return a cached AI wish, or generate one with at most one in-flight call per key.
+
+        Cache hits report ``"cache"`` as the service so the audit trail only
+        credits a provider when it was actually called.
+        """
+        key = self._wish_cache_key(request)
+        cached = self._wish_cache.get(key)
+        if cached:
+            return cached, "cache"
+
+        task = self._wish_inflight.get(key)
+        if task is not None:
+            # Share the in-flight call's result, even an empty one, rather than
+            # starting a duplicate generation
+            wish, ai_service_used = await asyncio.shield(task)
+            return (wish, "cache") if wish else (wish, ai_service_used)
+
+        task = asyncio.ensure_future(self._generate_and_cache(key, request))
+        self._wish_inflight[key] = task
+        # Shielded so a cancelled caller doesn't abort the call others are awaiting
+        return await asyncio.shield(task)
+
+    async def _generate_and_cache(self, key: tuple, request: AnniversaryWishRequest) -> Tuple[Optional[str], str]:
+        """Generate a wish for ``key``, cache it if non-empty, then retire the in-flight entry."""
+        try:
+            wish, ai_service_used = await self._generate_with_hedging(request)
+            if wish:
+                self._wish_cache[key] = wish
+            return wish, ai_service_used
+        finally:
+            self._wish_inflight.pop(key, None)
+
     async def generate_anniversary_wish(self, request: AnniversaryWishRequest,
                                        request_id: str, ip_address: str,
                                        original_request_id: Optional[str] = None,
-                                       owner_user_id: Optional[int] = None) -> str:
+                                       owner_user_id: Optional[int] = None,
+                                       use_cache: bool = True) -> str:
         """Generate an anniversary wish for the given request."""
-        ai_service_used = "unknown"
-
-        wish = await self.generate_wish_with_groq(request)
-        if wish:
-            ai_service_used = "groq"
-            await self._log_audit_trail(request_id, original_request_id, ip_address, request, wish, ai_service_used, owner_user_id)
-            return wish
+        if use_cache:
+            wish, ai_service_used = await self._generate_cached(request)
+        else:
+            wish, ai_service_used = await self._generate_with_hedging(request)
 
-        wish = await self.generate_wish_with_openai(request)
         if wish:
-            ai_service_used = "openai"
             await self._log_audit_trail(request_id, original_request_id, ip_address, request, wish, ai_service_used, owner_user_id)
             return wish
 
@@ -335,13 +696,14 @@ class AIWishGenerator:
                              ip_address: str, additional_context: Optional[str] = None,
                              owner_user_id: Optional[int] = None) -> str:
         """Regenerate an anniversary wish with additional context."""
-        updated_request = AnniversaryWishRequest(
-            name=original_request.name,
-            anniversary_type=original_request.anniversary_type,
-            relationship=original_request.relationship,
-            tone=original_request.tone,
-            context=original_request.context + f" {additional_context}" if original_request.context and additional_context else additional_context or original_request.context,
-        )
+        if additional_context and additional_context.strip():
+            # The other fields were validated with the original request, and
+            # _merge_context keeps the context within its length limit
+            updated_request = original_request.model_copy(
+                update={"context": _merge_context(original_request.context, additional_context)}
+            )
+        else:
+            updated_request = original_request
 
         return await self.generate_anniversary_wish(
             updated_request,
@@ -349,6 +711,8 @@ class AIWishGenerator:
             ip_address,
             original_request_id,
             owner_user_id=owner_user_id,
+            # A regeneration is an explicit request for a different wish
+            use_cache=False,
         )
 
 
@@ -1,8 +1,13 @@
 """
 Authentication utilities for the Church Anniversary & Birthday Helper app.
 """
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 import bcrypt
@@ -16,6 +21,24 @@ logger = logging.getLogger(__name__)
 # JWT security scheme
 security = HTTPBearer(auto_error=False)
 
+# bcrypt gets its own small pool so a burst of logins can't occupy every thread
+# in the default executor, which also runs the blocking Supabase calls.
+_password_hash_executor = ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 1),
+    thread_name_prefix="password-hash",
+)
+
+
+@lru_cache(maxsize=1024)
+def _decode_token(token: str, secret_key: str, algorithm: str) -> Dict[str, Any]:
+    """Verify a JWT signature and decode it, memoized per token.
+
+    Tokens are immutable, so a repeat bearer token skips the signature check;
+    callers must still check ``exp`` on every use since cached payloads outlive
+    the decode.
+    """
+    return jwt.decode(token, secret_key, algorithms=[algorithm])
+
 
 class AuthenticationService:
     """Service for handling authentication operations."""
@@ -47,6 +70,18 @@ class AuthenticationService:
                 detail="Error processing password",
             )
 
+    async def averify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password in the hashing pool so bcrypt doesn't block the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _password_hash_executor, self.verify_password, plain_password, hashed_password
+        )
+
+    async def aget_password_hash(self, password: str) -> str:
+        """Hash a password in the hashing pool so bcrypt doesn't block the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_hash_executor, self.get_password_hash, password)
+
     @staticmethod
     def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token."""
@@ -54,9 +89,9 @@ class AuthenticationService:
             to_encode = data.copy()
             
             if expires_delta:
-                expire = datetime.utcnow() + expires_delta
+                expire = int(time.time() + expires_delta.total_seconds())
             else:
-                expire = datetime.utcnow() + timedelta(minutes=settings.jwt_access_token_expire_minutes)
+                expire = int(time.time()) + settings.jwt_access_token_expire_minutes * 60
             
             to_encode.update({"exp": expire})
             
@@ -79,11 +114,7 @@ class AuthenticationService:
     def verify_token(token: str) -> Dict[str, Any]:
         """Verify and decode a JWT token."""
         try:
-            payload = jwt.decode(
-                token, 
-                settings.jwt_secret_key, 
-                algorithms=[settings.jwt_algorithm]
-            )
+            payload = dict(_decode_token(token, settings.jwt_secret_key, settings.jwt_algorithm))
             
             # Check if token has expired
             exp = payload.get("exp")
@@ -94,7 +125,7 @@ class AuthenticationService:
                     headers={"WWW-Authenticate": "Bearer"},
                 )
             
-            if datetime.utcnow() > datetime.fromtimestamp(exp):
+            if time.time() > exp:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Token has expired",
@@ -1,6 +1,7 @@
 """
 Configuration settings for the Church Anniversary & Birthday Helper app.
 """
+from functools import lru_cache
 from typing import Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field, ConfigDict
@@ -14,14 +15,46 @@ class Settings(BaseSettings):
     groq_model: str = Field("llama-3.1-8b-instant", env="GROQ_MODEL")
     openai_api_key: Optional[str] = Field(None, env="OPENAI_API_KEY")
     openai_model: str = Field("gpt-3.5-turbo", env="OPENAI_MODEL")
+    # Seconds to wait on Groq before also starting a speculative OpenAI request
+    ai_hedge_delay_seconds: float = Field(0.8, env="AI_HEDGE_DELAY_SECONDS")
+    groq_timeout: float = Field(8.0, env="GROQ_TIMEOUT")
+    openai_timeout: float = Field(8.0, env="OPENAI_TIMEOUT")
+    ai_max_attempts: int = Field(3, env="AI_MAX_ATTEMPTS")
+    ai_http_max_connections: int = Field(100, env="AI_HTTP_MAX_CONNECTIONS")
+    ai_http_max_keepalive_connections: int = Field(20, env="AI_HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    groq_max_concurrency: int = Field(20, env="GROQ_MAX_CONCURRENCY")
+    groq_circuit_failure_threshold: int = Field(5, env="GROQ_CIRCUIT_FAILURE_THRESHOLD")
+    groq_circuit_reset_seconds: float = Field(30.0, env="GROQ_CIRCUIT_RESET_SECONDS")
+    audit_batch_size: int = Field(100, env="AUDIT_BATCH_SIZE")
+    audit_flush_interval_seconds: float = Field(1.0, env="AUDIT_FLUSH_INTERVAL_SECONDS")
+    audit_queue_maxsize: int = Field(10000, env="AUDIT_QUEUE_MAXSIZE")
+    audit_write_max_attempts: int = Field(3, env="AUDIT_WRITE_MAX_ATTEMPTS")
+    wish_cache_size: int = Field(2048, env="WISH_CACHE_SIZE")
+    wish_cache_ttl_seconds: int = Field(86400, env="WISH_CACHE_TTL_SECONDS")
 
     # Supabase Database Configuration
     supabase_url: str = Field(..., env="SUPABASE_URL")
     supabase_key: str = Field(..., env="SUPABASE_KEY")
     supabase_service_key: Optional[str] = Field(None, env="SUPABASE_SERVICE_KEY")
+    supabase_http_max_connections: int = Field(50, env="SUPABASE_HTTP_MAX_CONNECTIONS")
+    supabase_http_max_keepalive_connections: int = Field(20, env="SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    supabase_http_keepalive_expiry: float = Field(60.0, env="SUPABASE_HTTP_KEEPALIVE_EXPIRY")
+    supabase_http_connect_timeout: float = Field(5.0, env="SUPABASE_HTTP_CONNECT_TIMEOUT")
+    csv_upsert_batch_size: int = Field(500, env="CSV_UPSERT_BATCH_SIZE")
+    csv_upsert_concurrency: int = Field(4, env="CSV_UPSERT_CONCURRENCY")
+    people_by_date_cache_ttl_seconds: int = Field(60, env="PEOPLE_BY_DATE_CACHE_TTL_SECONDS")
+    person_cache_ttl_seconds: int = Field(30, env="PERSON_CACHE_TTL_SECONDS")
+    all_people_cache_ttl_seconds: int = Field(30, env="ALL_PEOPLE_CACHE_TTL_SECONDS")
+    user_cache_ttl_seconds: int = Field(60, env="USER_CACHE_TTL_SECONDS")
+    health_ping_cache_seconds: float = Field(5.0, env="HEALTH_PING_CACHE_SECONDS")
+    person_batch_window_seconds: float = Field(0.005, env="PERSON_BATCH_WINDOW_SECONDS")
+    message_log_batch_size: int = Field(200, env="MESSAGE_LOG_BATCH_SIZE")
+    message_log_flush_interval_seconds: float = Field(0.5, env="MESSAGE_LOG_FLUSH_INTERVAL_SECONDS")
+    message_log_queue_maxsize: int = Field(10000, env="MESSAGE_LOG_QUEUE_MAXSIZE")
     
     # Supabase Storage Configuration
     supabase_storage_bucket: str = Field("csv-uploads", env="SUPABASE_STORAGE_BUCKET")
+    csv_max_upload_bytes: int = Field(10 * 1024 * 1024, env="CSV_MAX_UPLOAD_BYTES")
 
     # Sender configuration for multi-channel delivery
     twilio_account_sid: Optional[str] = Field(None, env="TWILIO_ACCOUNT_SID")
@@ -44,6 +77,10 @@ class Settings(BaseSettings):
     # Application Configuration
     schedule_time: str = Field("06:00", env="SCHEDULE_TIME")
     timezone: str = Field("Europe/London", env="TIMEZONE")
+    scheduler_enabled: bool = Field(True, env="SCHEDULER_ENABLED")
+    # Worker processes serving the app; in-process caches are only safe with one
+    web_concurrency: int = Field(1, env="WEB_CONCURRENCY")
+    celebration_send_concurrency: int = Field(16, env="CELEBRATION_SEND_CONCURRENCY")
 
     # Authentication Configuration
     jwt_secret_key: str = Field("your-super-secret-jwt-key-change-in-production", env="JWT_SECRET_KEY")
@@ -70,5 +107,11 @@ class Settings(BaseSettings):
     )
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once per process; the .env file is only parsed on first call."""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -1,9 +1,17 @@
 """
 Database connection and operations using Supabase.
 """
+import asyncio
 import logging
-from datetime import datetime, date, timedelta
-from typing import List, Optional, Dict, Any
+import time
+from datetime import datetime, date, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Dict, Any, Set, Tuple
+import httpx
+import orjson
+from cachetools import TTLCache
+from pydantic import TypeAdapter
+from postgrest.types import ReturnMethod
+from postgrest.utils import SyncClient
 from supabase import create_client, Client
 from app.config import settings
 from app.models import (
@@ -27,9 +35,66 @@ DEFAULT_NOTIFICATION_PREFERENCE = NotificationPreference.PERSONAL_REMINDER.value
 DEFAULT_NOTIFICATION_CHANNELS = [NotificationChannel.SMS.value, NotificationChannel.EMAIL.value]
 DEFAULT_DIRECT_MESSAGE_CHANNEL = NotificationChannel.SMS.value
 
+# Exactly the fields Person needs, so new columns don't silently widen every read
+PEOPLE_COLUMNS = (
+    "id, owner_user_id, name, event_type, event_date, year, spouse, phone_number, active, "
+    "created_at, updated_at"
+)
+MESSAGE_LOG_COLUMNS = (
+    "id, owner_user_id, person_id, message_content, sent_date, success, error_message, created_at, "
+    "people(name, event_type, phone_number)"
+)
+CSV_UPLOAD_COLUMNS = (
+    "id, owner_user_id, filename, upload_date, records_processed, records_added, records_updated, "
+    "success, error_message, storage_path"
+)
+USER_COLUMNS = (
+    "id, username, email, full_name, phone_number, password_hash, account_type, role, is_active, "
+    "created_at, updated_at, last_login"
+)
+NOTIFICATION_PREFERENCES_COLUMNS = "user_id, notification_preference, notification_channels, direct_message_channel"
+AI_WISH_AUDIT_LOG_COLUMNS = (
+    "id, owner_user_id, request_id, original_request_id, ip_address, request_data, response_data, "
+    "ai_service_used, created_at"
+)
+MAX_MESSAGE_LOG_PAGE_SIZE = 1000
+
+# Validates a whole result set in one call instead of one Person(**row) per row
+_PEOPLE_ADAPTER = TypeAdapter(List[Person])
+
 logger = logging.getLogger(__name__)
 
 
+class _NoCache(dict):
+    """Stand-in for a read cache that never keeps anything.
+
+    Used when several worker processes serve the app: a write only
+    invalidates the cache of the worker that handled it, so the others would
+    keep serving stale rows until the TTL ran out.
+    """
+
+    def __setitem__(self, key, value) -> None:
+        pass
+
+
+def _read_cache(maxsize: int, ttl: float):
+    """Return a TTL read cache, or a ``_NoCache`` when running several workers."""
+    if settings.web_concurrency > 1:
+        return _NoCache()
+    return TTLCache(maxsize=maxsize, ttl=ttl)
+
+
+class _PostgrestSession(SyncClient):
+    """PostgREST session that decodes response bodies with orjson."""
+
+    def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        response = super().send(request, **kwargs)
+        # postgrest-py parses every result through response.json(); orjson's
+        # decode error subclasses json.JSONDecodeError, so its handling holds
+        response.json = lambda **_: orjson.loads(response.content)
+        return response
+
+
 class DatabaseManager:
     """Manages database operations with Supabase."""
 
@@ -83,205 +148,230 @@ class DatabaseManager:
         return merged
 
     def __init__(self):
-        """Initialize Supabase client."""
+        """Initialize caches and writer state; the Supabase client is created lazily."""
+        # Short-lived read caches keyed by (owner_user_id, ...); any people
+        # mutation drops the owner's entries. Disabled with several workers.
+        self._people_by_date_cache = _read_cache(400, settings.people_by_date_cache_ttl_seconds)
+        self._person_cache = _read_cache(4096, settings.person_cache_ttl_seconds)
+        self._all_people_cache = _read_cache(128, settings.all_people_cache_ttl_seconds)
+        self._all_people_raw_cache = _read_cache(128, settings.all_people_cache_ttl_seconds)
+        # Users keyed by id; dropped on any write to the user or their preferences
+        self._user_cache = _read_cache(128, settings.user_cache_ttl_seconds)
+        # Pending get_person_by_id lookups per owner, resolved together
+        self._person_batches: Dict[int, Dict[int, asyncio.Future]] = {}
+        self._person_batch_tasks: Set[asyncio.Task] = set()
+        # Message logs are queued and inserted in batches by a background task
+        self._message_log_queue: Optional[asyncio.Queue] = None
+        self._message_log_writer_task: Optional[asyncio.Task] = None
+        # The Supabase client is created on first use
+        self._supabase: Optional[Client] = None
+        self._supabase_initialized = False
+        # Monotonic time of the last successful ping
+        self._last_ping_ok_at: Optional[float] = None
+
+    @property
+    def supabase(self) -> Optional[Client]:
+        """Supabase client, created on first use; ``None`` when not configured."""
+        if not self._supabase_initialized:
+            self._supabase = self._create_supabase_client()
+            self._supabase_initialized = True
+        return self._supabase
+
+    @supabase.setter
+    def supabase(self, client: Optional[Client]) -> None:
+        self._supabase = client
+        self._supabase_initialized = True
+
+    def _create_supabase_client(self) -> Optional[Client]:
+        """Build the Supabase client from settings, or return None if it can't be."""
         try:
             # Only initialize if we have valid settings
             if hasattr(settings, 'supabase_url') and hasattr(settings, 'supabase_key'):
                 supabase_token = settings.supabase_service_key or settings.supabase_key
 
                 if settings.supabase_url and supabase_token:
-                    self.supabase: Client = create_client(
+                    client = create_client(
                         settings.supabase_url,
                         supabase_token
                     )
+                    self._configure_postgrest_pool(client)
                     if settings.supabase_service_key:
                         logger.info("Initialized Supabase client with service role key for server-side operations")
                     else:
                         logger.warning("Supabase service role key not configured; falling back to SUPABASE_KEY")
-                else:
-                    logger.warning("Supabase credentials not configured. Database operations will be disabled.")
-                    self.supabase = None
+                    return client
+                logger.warning("Supabase credentials not configured. Database operations will be disabled.")
             else:
                 logger.warning("Supabase settings not found. Database operations will be disabled.")
-                self.supabase = None
         except Exception as e:
             logger.error(f"Failed to initialize Supabase client: {e}")
-            self.supabase = None
+        return None
 
-    async def initialize_tables(self):
-        """Create tables if they don't exist."""
-        try:
-            # Create people table
-            people_table = """
-            CREATE TABLE IF NOT EXISTS people (
-                id SERIAL PRIMARY KEY,
-                owner_user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                name VARCHAR(255) NOT NULL,
-                event_type VARCHAR(20) NOT NULL CHECK (event_type IN ('birthday', 'anniversary')),
-                event_date VARCHAR(5) NOT NULL,
-                year INTEGER,
-                spouse VARCHAR(255),
-                phone_number VARCHAR(30),
-                active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-            );
-            """
-
-            # Create message_logs table
-            message_logs_table = """
-            CREATE TABLE IF NOT EXISTS message_logs (
-                id SERIAL PRIMARY KEY,
-                owner_user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                person_id INTEGER REFERENCES people(id),
-                message_content TEXT NOT NULL,
-                sent_date DATE NOT NULL,
-                success BOOLEAN NOT NULL,
-                error_message TEXT,
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-            );
-            """
-
-            # Create csv_uploads table
-            csv_uploads_table = """
-            CREATE TABLE IF NOT EXISTS csv_uploads (
-                id SERIAL PRIMARY KEY,
-                owner_user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                filename VARCHAR(255) NOT NULL,
-                upload_date TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                records_processed INTEGER NOT NULL,
-                records_added INTEGER NOT NULL,
-                records_updated INTEGER NOT NULL,
-                success BOOLEAN NOT NULL,
-                error_message TEXT
-            );
-            """
-
-            # Create users table (identity only; delivery prefs live in
-            # user_notification_preferences).
-            users_table = """
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                username VARCHAR(100) UNIQUE NOT NULL,
-                email VARCHAR(255) UNIQUE,
-                full_name VARCHAR(255) NOT NULL,
-                phone_number VARCHAR(30),
-                password_hash VARCHAR(255) NOT NULL,
-                account_type VARCHAR(50) NOT NULL DEFAULT 'personal',
-                role VARCHAR(20) NOT NULL DEFAULT 'member',
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                last_login TIMESTAMP WITH TIME ZONE
-            );
-            """
-
-            # Create user_notification_preferences table
-            user_notification_preferences_table = """
-            CREATE TABLE IF NOT EXISTS user_notification_preferences (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER NOT NULL UNIQUE REFERENCES users(id) ON DELETE CASCADE,
-                notification_preference VARCHAR(50) NOT NULL DEFAULT 'personal_reminder',
-                notification_channels VARCHAR(255) NOT NULL DEFAULT 'sms,email',
-                direct_message_channel VARCHAR(50) NOT NULL DEFAULT 'sms',
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-            );
-            """
-
-            # Create rate_limiting table
-            rate_limiting_table = """
-            CREATE TABLE IF NOT EXISTS rate_limiting (
-                id SERIAL PRIMARY KEY,
-                ip_address VARCHAR(45) NOT NULL,
-                request_count INTEGER DEFAULT 1,
-                window_start TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                last_request_time TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                UNIQUE(ip_address)
-            );
-            """
-
-            # Create ai_wish_audit_logs table. owner_user_id is nullable because
-            # unauthenticated callers can generate wishes; those rows have no owner
-            # and are never surfaced through the per-user audit log endpoints.
-            ai_wish_audit_logs_table = """
-            CREATE TABLE IF NOT EXISTS ai_wish_audit_logs (
-                id SERIAL PRIMARY KEY,
-                owner_user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-                request_id VARCHAR(255) NOT NULL,
-                original_request_id VARCHAR(255),
-                ip_address VARCHAR(255) NOT NULL,
-                request_data JSONB NOT NULL,
-                response_data JSONB NOT NULL,
-                ai_service_used VARCHAR(50) NOT NULL,
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-            );
-            """
-
-            # Create index for efficient lookups
-            rate_limiting_index = """
-            CREATE INDEX IF NOT EXISTS idx_rate_limiting_ip_address ON rate_limiting(ip_address);
-            CREATE INDEX IF NOT EXISTS idx_rate_limiting_window_start ON rate_limiting(window_start);
-            """
-            
-            # Create indexes for AI wish audit logs
-            ai_wish_audit_indexes = """
-            CREATE INDEX IF NOT EXISTS idx_ai_wish_audit_request_id ON ai_wish_audit_logs(request_id);
-            CREATE INDEX IF NOT EXISTS idx_ai_wish_audit_original_request_id ON ai_wish_audit_logs(original_request_id);
-            CREATE INDEX IF NOT EXISTS idx_ai_wish_audit_created_at ON ai_wish_audit_logs(created_at);
-            CREATE INDEX IF NOT EXISTS idx_ai_wish_audit_ai_service ON ai_wish_audit_logs(ai_service_used);
-            """
-
-            # Execute table creation (Note: Supabase handles this via SQL editor)
-            logger.info("Database tables initialized successfully")
+    @staticmethod
+    def _configure_postgrest_pool(client: Client) -> None:
+        """Give the PostgREST session an explicit keep-alive pool, connect timeout and orjson decoding.
+
+        supabase-py builds one httpx session per client but exposes no way to
+        size its pool, so swap in an equivalent session with our limits.
+        """
+        postgrest = client.postgrest
+        session = postgrest.session
+        postgrest.session = _PostgrestSession(
+            base_url=session.base_url,
+            headers=session.headers,
+            timeout=httpx.Timeout(
+                session.timeout.read,
+                connect=settings.supabase_http_connect_timeout,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.supabase_http_max_connections,
+                max_keepalive_connections=settings.supabase_http_max_keepalive_connections,
+                keepalive_expiry=settings.supabase_http_keepalive_expiry,
+            ),
+        )
+        session.close()
+
+    def _invalidate_people_cache(self, owner_user_id: int) -> None:
+        """Drop cached people reads for ``owner_user_id`` after a mutation."""
+        for cache in (
+            self._people_by_date_cache,
+            self._person_cache,
+            self._all_people_cache,
+            self._all_people_raw_cache,
+        ):
+            for key in [key for key in list(cache.keys()) if key[0] == owner_user_id]:
+                cache.pop(key, None)
+
+    @staticmethod
+    async def _execute(query):
+        """Run a blocking PostgREST query in a worker thread so it doesn't stall the event loop.
 
+        supabase-py 2.1 only exposes a synchronous client; the pooled httpx
+        session underneath is thread-safe, so concurrent handlers overlap.
+        """
+        return await asyncio.to_thread(query.execute)
+
+    def start(self) -> None:
+        """Start the background message log writer."""
+        if self._message_log_writer_task is None:
+            self._message_log_queue = asyncio.Queue(maxsize=settings.message_log_queue_maxsize)
+            self._message_log_writer_task = asyncio.create_task(self._run_message_log_writer())
+
+    async def aclose(self) -> None:
+        """Flush pending message logs, then close the pooled PostgREST connections."""
+        if self._message_log_writer_task is not None:
+            # A None sentinel tells the writer to flush what it has and exit
+            await self._message_log_queue.put(None)
+            await self._message_log_writer_task
+            self._message_log_writer_task = None
+            self._message_log_queue = None
+
+        if self._supabase:
+            self._supabase.postgrest.session.close()
+
+    async def _run_message_log_writer(self) -> None:
+        """Drain the message log queue, inserting up to a batch per flush interval."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._message_log_queue.get()
+            if row is None:
+                break
+
+            batch = [row]
+            deadline = loop.time() + settings.message_log_flush_interval_seconds
+            while len(batch) < settings.message_log_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._message_log_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._write_message_log_batch(batch)
+
+    async def _write_message_log_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Insert a batch of message logs, falling back to row-by-row inserts if it fails."""
+        try:
+            await self._execute(self.supabase.table("message_logs").insert(batch, returning=ReturnMethod.minimal))
+            logger.info(f"Message logs created for {len(batch)} messages")
+            return
         except Exception as e:
-            logger.error(f"Error initializing database tables: {e}")
-            raise
+            logger.warning(f"Failed to insert {len(batch)} message logs, retrying row by row: {e}")
+
+        for row in batch:
+            try:
+                await self._execute(self.supabase.table("message_logs").insert(row, returning=ReturnMethod.minimal))
+            except Exception as e:
+                logger.error(f"Error logging message for person {row['person_id']}: {e}")
+
+    async def ping(self) -> None:
+        """Check the database answers, with a one-row query that returns no tenant data.
+
+        A success is reused for ``health_ping_cache_seconds`` so frequent probes
+        don't each cost a round trip; failures are never cached.
+        """
+        now = time.monotonic()
+        if self._last_ping_ok_at is not None and now - self._last_ping_ok_at < settings.health_ping_cache_seconds:
+            return
 
-    async def create_person(self, person_data: PersonCreate, *, owner_user_id: int) -> Person:
-        """Create a new person owned by ``owner_user_id``."""
         if not self.supabase:
             raise Exception("Database not initialized")
 
-        try:
-            data = {
-                "owner_user_id": owner_user_id,
-                "name": person_data.name,
-                "event_type": person_data.event_type.value,
-                "event_date": person_data.event_date,
-                "year": person_data.year,
-                "spouse": person_data.spouse,
-                "phone_number": person_data.phone_number,
-                "active": person_data.active
-            }
+        await self._execute(self.supabase.table("users").select("id").limit(1))
+        self._last_ping_ok_at = now
 
-            result = self.supabase.table("people").insert(data).execute()
+    async def initialize_tables(self):
+        """Log that the schema is managed by the Supabase migrations, not at runtime."""
+        logger.info("Database schema is managed by supabase/migrations; skipping runtime table setup")
 
-            if result.data:
-                return Person(**result.data[0])
-            else:
-                raise Exception("Failed to create person")
+    @staticmethod
+    def _person_row(person_data: PersonCreate, owner_user_id: int) -> Dict[str, Any]:
+        """Build the people row for ``person_data`` stamped with its owner."""
+        return {
+            "owner_user_id": owner_user_id,
+            "name": person_data.name,
+            "event_type": person_data.event_type.value,
+            "event_date": person_data.event_date,
+            "year": person_data.year,
+            "spouse": person_data.spouse,
+            "phone_number": person_data.phone_number,
+            "active": person_data.active
+        }
 
-        except Exception as e:
-            logger.error(f"Error creating person: {e}")
-            raise
+    async def create_person(self, person_data: PersonCreate, *, owner_user_id: int) -> Person:
+        """Create a new person owned by ``owner_user_id``.
+
+        Goes through the upsert key, so re-creating a soft-deleted person
+        reactivates their existing row instead of hitting the unique index.
+        """
+        people = await self.bulk_upsert_people([person_data], owner_user_id=owner_user_id)
+        return people[0]
 
     async def get_people_by_date(self, target_date: str, *, owner_user_id: int) -> List[Person]:
         """Get active people with events on a date, scoped to a single owner."""
+        cache_key = (owner_user_id, target_date)
+        cached = self._people_by_date_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
         try:
-            result = (
+            result = await self._execute(
                 self.supabase.table("people")
-                .select("*")
+                .select(PEOPLE_COLUMNS)
                 .eq("owner_user_id", owner_user_id)
                 .eq("event_date", target_date)
                 .eq("active", True)
-                .execute()
             )
 
-            return [Person(**person) for person in result.data]
+            people = _PEOPLE_ADAPTER.validate_python(result.data)
+            self._people_by_date_cache[cache_key] = people
+            return list(people)
 
         except Exception as e:
             logger.error(f"Error getting people by date: {e}")
@@ -289,14 +379,45 @@ class DatabaseManager:
 
     async def get_all_people(self, *, owner_user_id: int) -> List[Person]:
         """Get all people owned by ``owner_user_id``."""
+        cache_key = (owner_user_id,)
+        cached = self._all_people_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        try:
+            result = await self._execute(
+                self.supabase.table("people")
+                .select(PEOPLE_COLUMNS)
+                .eq("owner_user_id", owner_user_id)
+            )
+            people = _PEOPLE_ADAPTER.validate_python(result.data)
+            self._all_people_cache[cache_key] = people
+            return list(people)
+
+        except Exception as e:
+            logger.error(f"Error getting all people: {e}")
+            raise
+
+    async def get_all_people_raw(self, *, owner_user_id: int) -> List[Dict[str, Any]]:
+        """Get all people owned by ``owner_user_id`` as plain rows.
+
+        For callers that only re-serialize the result, so the rows skip
+        ``Person`` validation; use ``get_all_people`` for typed access.
+        """
+        cache_key = (owner_user_id,)
+        cached = self._all_people_raw_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
         try:
-            result = (
+            result = await self._execute(
                 self.supabase.table("people")
-                .select("*")
+                .select(PEOPLE_COLUMNS)
                 .eq("owner_user_id", owner_user_id)
-                .execute()
             )
-            return [Person(**person) for person in result.data]
+            rows = result.data or []
+            self._all_people_raw_cache[cache_key] = rows
+            return list(rows)
 
         except Exception as e:
             logger.error(f"Error getting all people: {e}")
@@ -308,39 +429,46 @@ class DatabaseManager:
         The upsert key is scoped to the owner so two different users can each
         have a "John Smith birthday" without colliding.
         """
+        people = await self.bulk_upsert_people([person_data], owner_user_id=owner_user_id)
+        return people[0]
+
+    async def bulk_upsert_people(
+        self,
+        people: List[PersonCreate],
+        *,
+        owner_user_id: int,
+    ) -> List[Person]:
+        """Insert or update many people in one request, keyed like ``upsert_person``.
+
+        Postgres rejects an ``ON CONFLICT DO UPDATE`` that touches the same row
+        twice, so repeated keys in ``people`` collapse to their last occurrence.
+        """
+        if not self.supabase:
+            raise Exception("Database not initialized")
+
+        if not people:
+            return []
+
         try:
-            existing = (
-                self.supabase.table("people")
-                .select("*")
-                .eq("owner_user_id", owner_user_id)
-                .eq("name", person_data.name)
-                .eq("event_type", person_data.event_type.value)
-                .execute()
-            )
+            rows_by_key: Dict[tuple, Dict[str, Any]] = {}
+            for person_data in people:
+                row = self._person_row(person_data, owner_user_id)
+                rows_by_key[(row["name"], row["event_type"])] = row
 
-            if existing.data:
-                person_id = existing.data[0]["id"]
-                update_data = {
-                    "event_date": person_data.event_date,
-                    "year": person_data.year,
-                    "spouse": person_data.spouse,
-                    "phone_number": person_data.phone_number,
-                    "active": person_data.active,
-                    "updated_at": datetime.now().isoformat()
-                }
-
-                result = (
-                    self.supabase.table("people")
-                    .update(update_data)
-                    .eq("id", person_id)
-                    .eq("owner_user_id", owner_user_id)
-                    .execute()
+            result = await self._execute(
+                self.supabase.table("people")
+                .upsert(
+                    list(rows_by_key.values()),
+                    on_conflict="owner_user_id,name,event_type",
                 )
-                return Person(**result.data[0])
-            return await self.create_person(person_data, owner_user_id=owner_user_id)
+            )
+            self._invalidate_people_cache(owner_user_id)
+            if not result.data:
+                raise Exception("Failed to upsert people")
+            return _PEOPLE_ADAPTER.validate_python(result.data)
 
         except Exception as e:
-            logger.error(f"Error upserting person: {e}")
+            logger.error(f"Error upserting people: {e}")
             raise
 
     async def log_message(
@@ -364,46 +492,109 @@ class DatabaseManager:
                 "error_message": error_message
             }
 
-            self.supabase.table("message_logs").insert(data).execute()
+            # Hand off to the batch writer; insert directly if it isn't running
+            # or is too far behind
+            if self._message_log_queue is not None:
+                try:
+                    self._message_log_queue.put_nowait(data)
+                    return
+                except asyncio.QueueFull:
+                    logger.warning(f"Message log queue full, writing log for person {person_id} directly")
+
+            await self._execute(self.supabase.table("message_logs").insert(data, returning=ReturnMethod.minimal))
             logger.info(f"Message log created for person {person_id}")
 
         except Exception as e:
             logger.error(f"Error logging message: {e}")
             raise
 
-    async def get_all_message_logs(self, *, owner_user_id: int):
-        """Get message logs owned by ``owner_user_id``, with person info joined."""
+    async def log_messages_bulk(self, entries: List[Dict[str, Any]], *, owner_user_id: int) -> None:
+        """Log several sent messages under ``owner_user_id`` at once.
+
+        Each entry carries the ``log_message`` arguments (``person_id``,
+        ``message_content``, ``sent_date``, ``success``, ``error_message``).
+        Rows go to the batch writer when it is running; otherwise they are
+        inserted in ``message_log_batch_size`` chunks.
+        """
+        rows = [
+            {
+                "owner_user_id": owner_user_id,
+                "person_id": entry["person_id"],
+                "message_content": entry["message_content"],
+                "sent_date": entry["sent_date"].isoformat(),
+                "success": entry["success"],
+                "error_message": entry.get("error_message"),
+            }
+            for entry in entries
+        ]
+
+        if self._message_log_queue is not None:
+            queued = 0
+            for row in rows:
+                try:
+                    self._message_log_queue.put_nowait(row)
+                except asyncio.QueueFull:
+                    logger.warning(f"Message log queue full, writing {len(rows) - queued} logs directly")
+                    break
+                queued += 1
+            rows = rows[queued:]
+
+        batch_size = max(1, settings.message_log_batch_size)
+        for start in range(0, len(rows), batch_size):
+            await self._write_message_log_batch(rows[start:start + batch_size])
+
+    @staticmethod
+    def _flatten_message_log(log: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten a message log row with its embedded person into the API shape."""
+        person = log.get("people") or {}
+        return {
+            "id": log["id"],
+            "owner_user_id": log["owner_user_id"],
+            "person_id": log["person_id"],
+            "message_content": log["message_content"],
+            "sent_date": log["sent_date"],
+            "success": log["success"],
+            "error_message": log.get("error_message"),
+            "created_at": log.get("created_at"),
+            "person_name": person.get("name"),
+            "person_event_type": person.get("event_type"),
+            "person_phone": person.get("phone_number"),
+        }
+
+    async def get_all_message_logs(
+        self,
+        limit: int = 200,
+        before_id: Optional[int] = None,
+        *,
+        owner_user_id: int,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Get a page of message logs owned by ``owner_user_id``, newest first, with person info joined.
+
+        Pages are keyed on ``id``: returns ``(rows, next_before_id)``, where
+        ``next_before_id`` is passed as ``before_id`` to fetch the next page
+        and is ``None`` once the last page has been read. The join and
+        flattening happen in the ``get_message_logs`` database function, so
+        rows come back in API shape.
+        """
         if not self.supabase:
             raise Exception("Database not initialized")
 
         try:
-            result = (
-                self.supabase.table("message_logs")
-                .select("*, people(name, event_type, phone_number)")
-                .eq("owner_user_id", owner_user_id)
-                .order("created_at", desc=True)
-                .execute()
+            page_size = min(max(limit, 1), MAX_MESSAGE_LOG_PAGE_SIZE)
+            result = await self._execute(
+                self.supabase.rpc(
+                    "get_message_logs",
+                    {
+                        "p_owner_user_id": owner_user_id,
+                        "p_before_id": before_id,
+                        "p_limit": page_size,
+                    },
+                )
             )
 
-            if result.data:
-                messages = []
-                for log in result.data:
-                    message_data = {
-                        "id": log["id"],
-                        "owner_user_id": log["owner_user_id"],
-                        "person_id": log["person_id"],
-                        "message_content": log["message_content"],
-                        "sent_date": log["sent_date"],
-                        "success": log["success"],
-                        "error_message": log["error_message"],
-                        "created_at": log["created_at"],
-                        "person_name": log["people"]["name"] if log["people"] else None,
-                        "person_event_type": log["people"]["event_type"] if log["people"] else None,
-                        "person_phone": log["people"]["phone_number"] if log["people"] else None
-                    }
-                    messages.append(message_data)
-                return messages
-            return []
+            rows = result.data
+            next_before_id = rows[-1]["id"] if len(rows) == page_size else None
+            return rows, next_before_id
 
         except Exception as e:
             logger.error(f"Error getting message logs: {e}")
@@ -420,29 +611,15 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = (
+            result = await self._execute(
                 self.supabase.table("message_logs")
-                .select("*, people(name, event_type, phone_number)")
+                .select(MESSAGE_LOG_COLUMNS)
                 .eq("id", message_id)
                 .eq("owner_user_id", owner_user_id)
-                .execute()
             )
 
             if result.data and len(result.data) > 0:
-                log = result.data[0]
-                return {
-                    "id": log["id"],
-                    "owner_user_id": log["owner_user_id"],
-                    "person_id": log["person_id"],
-                    "message_content": log["message_content"],
-                    "sent_date": log["sent_date"],
-                    "success": log["success"],
-                    "error_message": log["error_message"],
-                    "created_at": log["created_at"],
-                    "person_name": log["people"]["name"] if log["people"] else None,
-                    "person_event_type": log["people"]["event_type"] if log["people"] else None,
-                    "person_phone": log["people"]["phone_number"] if log["people"] else None
-                }
+                return self._flatten_message_log(result.data[0])
             return None
 
         except Exception as e:
@@ -450,26 +627,58 @@ class DatabaseManager:
             raise
 
     async def get_person_by_id(self, person_id: int, *, owner_user_id: int) -> Optional[Person]:
-        """Get a person if owned by ``owner_user_id``; otherwise return None."""
+        """Get a person if owned by ``owner_user_id``; otherwise return None.
+
+        Lookups for the same owner that arrive within a short window share a
+        single ``id IN (...)`` query.
+        """
         if not self.supabase:
             raise Exception("Database not initialized")
 
+        cache_key = (owner_user_id, person_id)
+        cached = self._person_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        batch = self._person_batches.get(owner_user_id)
+        if batch is None:
+            batch = self._person_batches[owner_user_id] = {}
+            task = asyncio.create_task(self._flush_person_batch(owner_user_id))
+            self._person_batch_tasks.add(task)
+            task.add_done_callback(self._person_batch_tasks.discard)
+
+        future = batch.get(person_id)
+        if future is None:
+            future = batch[person_id] = asyncio.get_running_loop().create_future()
+        # Shielded so one cancelled caller doesn't cancel the lookup for the rest
+        return await asyncio.shield(future)
+
+    async def _flush_person_batch(self, owner_user_id: int) -> None:
+        """Resolve every queued get_person_by_id lookup for an owner with one query."""
+        await asyncio.sleep(settings.person_batch_window_seconds)
+        batch = self._person_batches.pop(owner_user_id)
+
         try:
-            result = (
+            result = await self._execute(
                 self.supabase.table("people")
-                .select("*")
-                .eq("id", person_id)
+                .select(PEOPLE_COLUMNS)
                 .eq("owner_user_id", owner_user_id)
-                .execute()
+                .in_("id", list(batch))
             )
-
-            if result.data and len(result.data) > 0:
-                return Person(**result.data[0])
-            return None
-
+            people = {person.id: person for person in _PEOPLE_ADAPTER.validate_python(result.data)}
         except Exception as e:
-            logger.error(f"Error getting person {person_id}: {e}")
-            raise
+            logger.error(f"Error getting people {sorted(batch)}: {e}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for person_id, future in batch.items():
+            person = people.get(person_id)
+            if person is not None:
+                self._person_cache[(owner_user_id, person_id)] = person
+            if not future.done():
+                future.set_result(person)
 
     async def update_person(
         self,
@@ -500,26 +709,17 @@ class DatabaseManager:
                 update_data["active"] = person_data.active
 
             if update_data:
-                update_data["updated_at"] = datetime.now().isoformat()
-
-                update_result = (
+                update_result = await self._execute(
                     self.supabase.table("people")
                     .update(update_data)
                     .eq("id", person_id)
                     .eq("owner_user_id", owner_user_id)
-                    .execute()
                 )
+                self._invalidate_people_cache(owner_user_id)
 
+                # PostgREST returns the updated row, so no follow-up select
                 if update_result.data:
-                    fetch_result = (
-                        self.supabase.table("people")
-                        .select("*")
-                        .eq("id", person_id)
-                        .eq("owner_user_id", owner_user_id)
-                        .execute()
-                    )
-                    if fetch_result.data and len(fetch_result.data) > 0:
-                        return Person(**fetch_result.data[0])
+                    return Person(**update_result.data[0])
 
             return None
 
@@ -533,18 +733,13 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = (
+            result = await self._execute(
                 self.supabase.table("people")
-                .update(
-                    {
-                        "active": False,
-                        "updated_at": datetime.now().isoformat(),
-                    }
-                )
+                .update({"active": False})
                 .eq("id", person_id)
                 .eq("owner_user_id", owner_user_id)
-                .execute()
             )
+            self._invalidate_people_cache(owner_user_id)
 
             return bool(result.data)
 
@@ -572,7 +767,7 @@ class DatabaseManager:
             data = {
                 "owner_user_id": owner_user_id,
                 "filename": filename,
-                "upload_date": datetime.now().isoformat(),
+                "upload_date": datetime.now(timezone.utc).isoformat(),
                 "records_processed": records_processed,
                 "records_added": records_added,
                 "records_updated": records_updated,
@@ -581,31 +776,44 @@ class DatabaseManager:
                 "storage_path": storage_path
             }
 
-            self.supabase.table("csv_uploads").insert(data).execute()
+            await self._execute(self.supabase.table("csv_uploads").insert(data, returning=ReturnMethod.minimal))
             logger.info(f"CSV upload log created for file {filename}")
 
         except Exception as e:
             logger.error(f"Error logging CSV upload: {e}")
             raise
 
-    async def get_csv_upload_history(self, *, owner_user_id: int) -> List[Dict[str, Any]]:
-        """Get CSV upload history for ``owner_user_id``."""
+    async def iter_csv_upload_history(
+        self,
+        page_size: int = 100,
+        *,
+        owner_user_id: int,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield CSV upload history for ``owner_user_id``, newest first, a page at a time."""
         if not self.supabase:
             raise Exception("Database not initialized")
 
-        try:
-            result = (
-                self.supabase.table("csv_uploads")
-                .select("*")
-                .eq("owner_user_id", owner_user_id)
-                .order("upload_date", desc=True)
-                .execute()
-            )
-            return result.data if result.data else []
+        offset = 0
+        while True:
+            try:
+                result = await self._execute(
+                    self.supabase.table("csv_uploads")
+                    .select(CSV_UPLOAD_COLUMNS)
+                    .eq("owner_user_id", owner_user_id)
+                    .order("upload_date", desc=True)
+                    .order("id", desc=True)
+                    .range(offset, offset + page_size - 1)
+                )
+            except Exception as e:
+                logger.error(f"Error getting CSV upload history: {e}")
+                raise
 
-        except Exception as e:
-            logger.error(f"Error getting CSV upload history: {e}")
-            raise
+            rows = result.data or []
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            offset += page_size
 
     # User Management Methods
 
@@ -614,11 +822,10 @@ class DatabaseManager:
         if not self.supabase:
             raise Exception("Database not initialized")
 
-        result = (
+        result = await self._execute(
             self.supabase.table("user_notification_preferences")
-            .select("*")
+            .select(NOTIFICATION_PREFERENCES_COLUMNS)
             .eq("user_id", user_id)
-            .execute()
         )
         if result.data and len(result.data) > 0:
             return result.data[0]
@@ -641,23 +848,21 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         existing = await self._get_notification_preferences(user_id)
-        now_iso = datetime.now().isoformat()
 
         if existing:
-            update_data: Dict[str, Any] = {"updated_at": now_iso}
+            update_data: Dict[str, Any] = {}
             if notification_preference is not None:
                 update_data["notification_preference"] = notification_preference
             if notification_channels is not None:
                 update_data["notification_channels"] = notification_channels
             if direct_message_channel is not None:
                 update_data["direct_message_channel"] = direct_message_channel
-            if len(update_data) == 1:  # only updated_at changed
+            if not update_data:
                 return existing
-            result = (
+            result = await self._execute(
                 self.supabase.table("user_notification_preferences")
                 .update(update_data)
                 .eq("user_id", user_id)
-                .execute()
             )
             if result.data:
                 return result.data[0]
@@ -669,10 +874,9 @@ class DatabaseManager:
             "notification_channels": notification_channels or ",".join(DEFAULT_NOTIFICATION_CHANNELS),
             "direct_message_channel": direct_message_channel or DEFAULT_DIRECT_MESSAGE_CHANNEL,
         }
-        result = (
+        result = await self._execute(
             self.supabase.table("user_notification_preferences")
             .insert(insert_data)
-            .execute()
         )
         if result.data:
             return result.data[0]
@@ -700,7 +904,7 @@ class DatabaseManager:
                 "is_active": user_data.is_active,
             }
 
-            result = self.supabase.table("users").insert(data).execute()
+            result = await self._execute(self.supabase.table("users").insert(data))
 
             if not result.data:
                 raise Exception("Failed to create user")
@@ -726,7 +930,7 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = self.supabase.table("users").select("*").eq("username", username).execute()
+            result = await self._execute(self.supabase.table("users").select(USER_COLUMNS).eq("username", username))
 
             if result.data and len(result.data) > 0:
                 return await self._build_user(result.data[0])
@@ -742,7 +946,7 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = self.supabase.table("users").select("*").eq("email", email).execute()
+            result = await self._execute(self.supabase.table("users").select(USER_COLUMNS).eq("email", email))
 
             if result.data and len(result.data) > 0:
                 return await self._build_user(result.data[0])
@@ -762,14 +966,20 @@ class DatabaseManager:
 
     async def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Get a user by ID."""
+        cached = self._user_cache.get(user_id)
+        if cached is not None:
+            return cached.model_copy()
+
         if not self.supabase:
             raise Exception("Database not initialized")
 
         try:
-            result = self.supabase.table("users").select("*").eq("id", user_id).execute()
+            result = await self._execute(self.supabase.table("users").select(USER_COLUMNS).eq("id", user_id))
 
             if result.data and len(result.data) > 0:
-                return await self._build_user(result.data[0])
+                user = await self._build_user(result.data[0])
+                self._user_cache[user_id] = user
+                return user.model_copy()
             return None
 
         except Exception as e:
@@ -782,10 +992,10 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = self.supabase.table("users").update({
-                "last_login": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }).eq("id", user_id).execute()
+            result = await self._execute(self.supabase.table("users").update({
+                "last_login": datetime.now(timezone.utc).isoformat(),
+            }).eq("id", user_id))
+            self._user_cache.pop(user_id, None)
 
             return result.data and len(result.data) > 0
 
@@ -811,8 +1021,7 @@ class DatabaseManager:
                 identity_update["phone_number"] = user_data.phone_number
 
             if identity_update:
-                identity_update["updated_at"] = datetime.now().isoformat()
-                self.supabase.table("users").update(identity_update).eq("id", user_id).execute()
+                await self._execute(self.supabase.table("users").update(identity_update).eq("id", user_id))
 
             touches_preferences = (
                 user_data.notification_preference is not None
@@ -839,6 +1048,7 @@ class DatabaseManager:
                     ),
                 )
 
+            self._user_cache.pop(user_id, None)
             return await self.get_user_by_id(user_id)
 
         except Exception as e:
@@ -864,7 +1074,7 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = self.supabase.table("users").select("*").eq("is_active", True).execute()
+            result = await self._execute(self.supabase.table("users").select(USER_COLUMNS).eq("is_active", True))
             users: List[User] = []
             for record in result.data or []:
                 users.append(await self._build_user(record))
@@ -880,7 +1090,7 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = self.supabase.table("rate_limiting").select("*").eq("ip_address", ip_address).execute()
+            result = await self._execute(self.supabase.table("rate_limiting").select("request_count, window_start").eq("ip_address", ip_address))
 
             if result.data and len(result.data) > 0:
                 return result.data[0]
@@ -890,78 +1100,52 @@ class DatabaseManager:
             logger.error(f"Error getting rate limit record for IP {ip_address}: {e}")
             raise
 
-    async def create_rate_limit_record(self, ip_address: str) -> Dict[str, Any]:
-        """Create a new rate limit record for an IP address."""
+    async def check_and_increment_rate_limit(
+        self, ip_address: str, max_requests: int, window_seconds: int
+    ) -> Dict[str, Any]:
+        """Count a request from ``ip_address`` and report whether it is within the limit.
+
+        The check and increment run atomically in the ``check_rate_limit``
+        database function; returns its ``allowed``, ``request_count`` and
+        ``window_start`` columns.
+        """
         if not self.supabase:
             raise Exception("Database not initialized")
 
         try:
-            now = datetime.now().isoformat()
-            data = {
-                "ip_address": ip_address,
-                "request_count": 1,
-                "window_start": now,
-                "last_request_time": now
-            }
-
-            result = self.supabase.table("rate_limiting").insert(data).execute()
+            result = await self._execute(
+                self.supabase.rpc(
+                    "check_rate_limit",
+                    {
+                        "p_ip_address": ip_address,
+                        "p_max_requests": max_requests,
+                        "p_window_seconds": window_seconds,
+                    },
+                )
+            )
 
             if result.data:
                 return result.data[0]
-            else:
-                raise Exception("Failed to create rate limit record")
-
-        except Exception as e:
-            logger.error(f"Error creating rate limit record for IP {ip_address}: {e}")
-            raise
-
-    async def update_rate_limit_record(self, ip_address: str, request_count: int, window_start: datetime, last_request_time: datetime) -> bool:
-        """Update an existing rate limit record."""
-        if not self.supabase:
-            raise Exception("Database not initialized")
-
-        try:
-            result = self.supabase.table("rate_limiting").update({
-                "request_count": request_count,
-                "window_start": window_start.isoformat(),
-                "last_request_time": last_request_time.isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }).eq("ip_address", ip_address).execute()
-
-            return result.data and len(result.data) > 0
+            raise Exception("Rate limit check returned no row")
 
         except Exception as e:
-            logger.error(f"Error updating rate limit record for IP {ip_address}: {e}")
-            raise
-
-    async def reset_rate_limit_window(self, ip_address: str) -> bool:
-        """Reset the rate limit window for an IP address."""
-        if not self.supabase:
-            raise Exception("Database not initialized")
-
-        try:
-            now = datetime.now()
-            result = self.supabase.table("rate_limiting").update({
-                "request_count": 1,
-                "window_start": now.isoformat(),
-                "last_request_time": now.isoformat(),
-                "updated_at": now.isoformat()
-            }).eq("ip_address", ip_address).execute()
-
-            return result.data and len(result.data) > 0
-
-        except Exception as e:
-            logger.error(f"Error resetting rate limit window for IP {ip_address}: {e}")
+            logger.error(f"Error checking rate limit for IP {ip_address}: {e}")
             raise
 
     async def cleanup_expired_rate_limits(self, hours_old: int = 24) -> int:
-        """Clean up rate limit records older than specified hours."""
+        """Clean up rate limit records idle for longer than ``hours_old`` hours.
+
+        The purge-idle-rate-limits pg_cron job does this every 15 minutes; this
+        method is only for running it on demand.
+        """
         if not self.supabase:
             raise Exception("Database not initialized")
 
         try:
-            cutoff_time = datetime.now() - timedelta(hours=hours_old)
-            result = self.supabase.table("rate_limiting").delete().lt("created_at", cutoff_time.isoformat()).execute()
+            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_old)
+            result = await self._execute(
+                self.supabase.table("rate_limiting").delete().lt("last_request_time", cutoff_time.isoformat())
+            )
 
             return len(result.data) if result.data else 0
 
@@ -970,6 +1154,19 @@ class DatabaseManager:
             raise
 
     # AI Wish Generation Audit Trail Methods
+    @staticmethod
+    def _audit_log_row(audit_data: AIWishAuditLogCreate) -> Dict[str, Any]:
+        """Build the ai_wish_audit_logs row for an audit entry."""
+        return {
+            "owner_user_id": audit_data.owner_user_id,
+            "request_id": audit_data.request_id,
+            "original_request_id": audit_data.original_request_id,
+            "ip_address": audit_data.ip_address,
+            "request_data": audit_data.request_data,
+            "response_data": audit_data.response_data,
+            "ai_service_used": audit_data.ai_service_used
+        }
+
     async def log_ai_wish_request(self, audit_data: AIWishAuditLogCreate) -> AIWishAuditLog:
         """Log an AI wish generation request and response.
 
@@ -980,17 +1177,9 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            data = {
-                "owner_user_id": audit_data.owner_user_id,
-                "request_id": audit_data.request_id,
-                "original_request_id": audit_data.original_request_id,
-                "ip_address": audit_data.ip_address,
-                "request_data": audit_data.request_data,
-                "response_data": audit_data.response_data,
-                "ai_service_used": audit_data.ai_service_used
-            }
+            data = self._audit_log_row(audit_data)
 
-            result = self.supabase.table("ai_wish_audit_logs").insert(data).execute()
+            result = await self._execute(self.supabase.table("ai_wish_audit_logs").insert(data))
 
             if result.data:
                 return AIWishAuditLog(**result.data[0])
@@ -1001,6 +1190,23 @@ class DatabaseManager:
             logger.error(f"Error logging AI wish request: {e}")
             raise
 
+    async def bulk_log_ai_wish_requests(self, audit_entries: List[AIWishAuditLogCreate]) -> int:
+        """Insert a batch of AI wish audit entries in a single request."""
+        if not self.supabase:
+            raise Exception("Database not initialized")
+
+        if not audit_entries:
+            return 0
+
+        try:
+            rows = [self._audit_log_row(audit_data) for audit_data in audit_entries]
+            await self._execute(self.supabase.table("ai_wish_audit_logs").insert(rows, returning=ReturnMethod.minimal))
+            return len(rows)
+
+        except Exception as e:
+            logger.error(f"Error bulk logging AI wish requests: {e}")
+            raise
+
     async def get_ai_wish_audit_logs(
         self,
         limit: int = 100,
@@ -1013,13 +1219,12 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = (
+            result = await self._execute(
                 self.supabase.table("ai_wish_audit_logs")
-                .select("*")
+                .select(AI_WISH_AUDIT_LOG_COLUMNS)
                 .eq("owner_user_id", owner_user_id)
                 .order("created_at", desc=True)
                 .range(offset, offset + limit - 1)
-                .execute()
             )
 
             return [AIWishAuditLog(**log) for log in result.data] if result.data else []
@@ -1048,12 +1253,12 @@ class DatabaseManager:
         try:
             query = (
                 self.supabase.table("ai_wish_audit_logs")
-                .select("*")
+                .select(AI_WISH_AUDIT_LOG_COLUMNS)
                 .eq("request_id", request_id)
             )
             if owner_user_id is not None:
                 query = query.eq("owner_user_id", owner_user_id)
-            result = query.execute()
+            result = await self._execute(query)
 
             if result.data and len(result.data) > 0:
                 return AIWishAuditLog(**result.data[0])
@@ -1074,13 +1279,12 @@ class DatabaseManager:
             raise Exception("Database not initialized")
 
         try:
-            result = (
+            result = await self._execute(
                 self.supabase.table("ai_wish_audit_logs")
-                .select("*")
+                .select(AI_WISH_AUDIT_LOG_COLUMNS)
                 .eq("original_request_id", original_request_id)
                 .eq("owner_user_id", owner_user_id)
                 .order("created_at", desc=True)
-                .execute()
             )
 
             return [AIWishAuditLog(**log) for log in result.data] if result.data else []
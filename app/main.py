@@ -1,20 +1,25 @@
 """
 Main FastAPI application for the Church Anniversary & Birthday Helper.
 """
+import hashlib
 import logging
+import os
+import re
+import tempfile
 import uuid
 from contextlib import asynccontextmanager
 from datetime import date
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 from pathlib import Path
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, status, Depends, Header, Request
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, status, Depends, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from app.config import settings
-from app.database import db_manager
+from app.database import MAX_MESSAGE_LOG_PAGE_SIZE, db_manager
 from app.models import (
     Person, PersonUpdate, LoginRequest, LoginResponse, RegisterRequest, RegisterResponse, UserBase, UserCreate, UserRole,
     AnniversaryWishRequest, AnniversaryWishResponse, RegenerateWishRequest, CoordinatorDeliveryTestRequest, UserProfileUpdate,
@@ -61,8 +66,14 @@ async def lifespan(app: FastAPI):
         # Initialize database
         await db_manager.initialize_tables()
 
-        # Start scheduler
-        celebration_scheduler.start()
+        # Start the message log and AI wish audit writers; AI clients are
+        # created on first use
+        db_manager.start()
+        ai_wish_generator.start()
+
+        # Start scheduler; under Gunicorn only one worker has it enabled
+        if settings.scheduler_enabled:
+            celebration_scheduler.start()
 
         logger.info("Application started successfully")
 
@@ -74,7 +85,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down application...")
-    celebration_scheduler.stop()
+    if settings.scheduler_enabled:
+        celebration_scheduler.stop()
+    await ai_wish_generator.aclose()
+    await db_manager.aclose()
 
 
 # Create FastAPI app
@@ -110,6 +124,7 @@ app = FastAPI(
     """,
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     contact={
         "name": "Church Anniversary Helper Support",
         "email": "support@anniversaryhelper.com",
@@ -153,10 +168,7 @@ async def health_check():
     tenant-scoped, so the endpoint stays usable without authentication.
     """
     try:
-        if db_manager.supabase is None:
-            raise Exception("Database not initialized")
-        # Cheap ping that doesn't return tenant data.
-        db_manager.supabase.table("users").select("id").limit(1).execute()
+        await db_manager.ping()
 
         scheduler_status = celebration_scheduler.get_status()
 
@@ -177,8 +189,16 @@ async def health_check():
         )
 
 
+async def record_login_background(user_id: int):
+    """Background task to stamp a user's last login after the response is sent."""
+    try:
+        await db_manager.update_user_last_login(user_id)
+    except Exception as e:
+        logger.warning(f"Could not record last login for user {user_id}: {e}")
+
+
 @app.post("/auth/login", response_model=LoginResponse)
-async def login(login_data: LoginRequest):
+async def login(login_data: LoginRequest, background_tasks: BackgroundTasks):
     """
     User login endpoint.
     
@@ -201,14 +221,14 @@ async def login(login_data: LoginRequest):
                 detail="Account is deactivated"
             )
         
-        if not auth_service.verify_password(login_data.password, user.password_hash):
+        if not await auth_service.averify_password(login_data.password, user.password_hash):
             logger.warning(f"Login attempt with invalid password for user: {login_data.email}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
         
-        await db_manager.update_user_last_login(user.id)
+        background_tasks.add_task(record_login_background, user.id)
         
         token_data = {
             "sub": str(user.id),
@@ -259,7 +279,7 @@ async def register(register_data: RegisterRequest):
                 detail="An account with this email already exists"
             )
 
-        password_hash = auth_service.get_password_hash(register_data.password)
+        password_hash = await auth_service.aget_password_hash(register_data.password)
         user = await db_manager.create_user(
             user_data=UserCreate(
                 username=register_data.username,
@@ -366,11 +386,40 @@ async def update_current_user_info(
         )
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against ``etag`` using weak comparison (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque_tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _conditional_json(request: Request, content: Any) -> Response:
+    """Serialize ``content`` with an ETag, answering 304 if the client already has it."""
+    # ORJSONResponse renders the body up front, so the ETag hashes that body
+    # instead of serializing the content a second time
+    response = ORJSONResponse(content)
+    etag = f'"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, must-revalidate"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return response
+
+
 @app.get("/people", response_model=List[Person])
-async def get_all_people(current_user: Dict[str, Any] = Depends(get_current_user)):
+async def get_all_people(request: Request, current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get the caller's people."""
     try:
-        return await db_manager.get_all_people(owner_user_id=current_user["id"])
+        # Rows come straight from the database in Person's shape; returning a
+        # response directly skips re-validating them against response_model
+        rows = await db_manager.get_all_people_raw(owner_user_id=current_user["id"])
+        return _conditional_json(request, rows)
     except Exception as e:
         logger.error(f"Error getting people: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -437,11 +486,14 @@ async def get_todays_celebrations(current_user: Dict[str, Any] = Depends(get_cur
         raise HTTPException(status_code=500, detail=str(e))
 
 
+MM_DD_PATTERN = re.compile(r"(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])")
+
+
 @app.get("/celebrations/{date_str}", response_model=List[Person])
 async def get_celebrations_for_date(date_str: str, current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get celebrations for ``date_str`` (MM-DD) scoped to the caller."""
     try:
-        if len(date_str) != 5 or date_str[2] != '-':
+        if not MM_DD_PATTERN.fullmatch(date_str):
             raise HTTPException(status_code=400, detail="Date must be in MM-DD format")
 
         return await db_manager.get_people_by_date(
@@ -454,6 +506,37 @@ async def get_celebrations_for_date(date_str: str, current_user: Dict[str, Any]
         raise HTTPException(status_code=500, detail=str(e))
 
 
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+
+
+async def _spool_upload(file: UploadFile, max_bytes: int) -> str:
+    """Copy an upload to a temporary file in fixed-size chunks and return its path.
+
+    Rejects the upload once it passes ``max_bytes``. The caller owns the file
+    and must remove it.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as spooled:
+        try:
+            while chunk := await file.read(UPLOAD_READ_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"CSV file exceeds the {max_bytes} byte limit",
+                    )
+                digest.update(chunk)
+                spooled.write(chunk)
+        except BaseException:
+            spooled.close()
+            os.unlink(spooled.name)
+            raise
+
+    logger.info("Received %s (%d bytes, sha256 %s)", file.filename, size, digest.hexdigest())
+    return spooled.name
+
+
 @app.post("/upload-csv")
 async def upload_csv(background_tasks: BackgroundTasks, file: UploadFile = File(...), current_user: Dict[str, Any] = Depends(get_current_user)):
     """Upload a CSV; its rows land in the caller's people set."""
@@ -461,23 +544,32 @@ async def upload_csv(background_tasks: BackgroundTasks, file: UploadFile = File(
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="File must be a CSV")
 
-        file_content = await file.read()
+        spooled_path = await _spool_upload(file, settings.csv_max_upload_bytes)
+        handed_off = False
+        try:
+            with open(spooled_path, "rb") as spooled:
+                upload_result = await storage_manager.upload_csv_file(
+                    spooled, file.filename, owner_user_id=current_user["id"]
+                )
 
-        upload_result = await storage_manager.upload_csv_file(
-            file_content, file.filename, owner_user_id=current_user["id"]
-        )
+            if not upload_result["success"]:
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"Failed to upload file to storage: {upload_result.get('error', 'Unknown error')}"
+                )
 
-        if not upload_result["success"]:
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Failed to upload file to storage: {upload_result.get('error', 'Unknown error')}"
+            # The background task parses the spooled copy instead of
+            # downloading the object again, and removes it when done
+            background_tasks.add_task(
+                process_csv_background,
+                upload_result["file_path"],
+                current_user["id"],
+                spooled_path,
             )
-
-        background_tasks.add_task(
-            process_csv_background,
-            upload_result["file_path"],
-            current_user["id"],
-        )
+            handed_off = True
+        finally:
+            if not handed_off:
+                os.unlink(spooled_path)
 
         return {
             "message": "CSV file uploaded successfully to cloud storage",
@@ -492,13 +584,22 @@ async def upload_csv(background_tasks: BackgroundTasks, file: UploadFile = File(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def process_csv_background(file_path: str, owner_user_id: int):
-    """Background task to process an owner's CSV upload."""
+async def process_csv_background(file_path: str, owner_user_id: int, local_path: Optional[str] = None):
+    """Background task to process an owner's CSV upload.
+
+    ``local_path`` is the upload's spooled copy, read instead of re-downloading
+    ``file_path`` and deleted afterwards.
+    """
     try:
-        result = await csv_manager.process_csv_file(file_path, owner_user_id=owner_user_id)
+        result = await csv_manager.process_csv_file(
+            file_path, owner_user_id=owner_user_id, local_path=local_path
+        )
         logger.info(f"CSV processing completed: {result}")
     except Exception as e:
         logger.error(f"Error processing CSV in background: {e}")
+    finally:
+        if local_path is not None:
+            os.unlink(local_path)
         
 
 @app.post("/scheduler/cron-hook")
@@ -554,10 +655,23 @@ async def test_coordinator_delivery(
 
 
 @app.get("/messages")
-async def get_message_logs(current_user: Dict[str, Any] = Depends(get_current_user)):
-    """Get the caller's message logs."""
+async def get_message_logs(
+    request: Request,
+    limit: int = Query(200, ge=1, le=MAX_MESSAGE_LOG_PAGE_SIZE),
+    before_id: Optional[int] = Query(None, ge=1),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Get a page of the caller's message logs, newest first.
+
+    Returns ``{"items": [...], "next_before_id": ...}``; pass
+    ``next_before_id`` as ``before_id`` to fetch the next page. It is
+    ``null`` on the last page.
+    """
     try:
-        return await db_manager.get_all_message_logs(owner_user_id=current_user["id"])
+        logs, next_before_id = await db_manager.get_all_message_logs(
+            limit=limit, before_id=before_id, owner_user_id=current_user["id"]
+        )
+        return _conditional_json(request, {"items": logs, "next_before_id": next_before_id})
     except Exception as e:
         logger.error(f"Error getting message logs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -580,14 +694,28 @@ async def get_message_log(message_id: int, current_user: Dict[str, Any] = Depend
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _stream_json_array(first: Optional[Dict[str, Any]], rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Serialize rows as a JSON array one element at a time."""
+    if first is None:
+        yield b"[]"
+        return
+    yield b"[" + orjson.dumps(first)
+    async for row in rows:
+        yield b"," + orjson.dumps(row)
+    yield b"]"
+
+
 @app.get("/csv-uploads")
 async def get_csv_upload_history(current_user: Dict[str, Any] = Depends(get_current_user)):
-    """Get the caller's CSV upload history."""
+    """Stream the caller's CSV upload history as a JSON array."""
+    rows = db_manager.iter_csv_upload_history(owner_user_id=current_user["id"])
     try:
-        return await db_manager.get_csv_upload_history(owner_user_id=current_user["id"])
+        # Fetch the first page before responding so failures still return a 500
+        first = await anext(rows, None)
     except Exception as e:
         logger.error(f"Error getting CSV upload history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(_stream_json_array(first, rows), media_type="application/json")
 
 
 @app.get("/csv-files")
@@ -783,7 +911,11 @@ async def regenerate_anniversary_wish(
         # Look up the original request. Authenticated callers are scoped to
         # their own request history; anonymous callers can still regenerate by
         # id (the generated wish is not returned unless the original exists).
-        original_audit_log = await db_manager.get_ai_wish_audit_log_by_request_id(
+        # Check the audit writer's queue first: a fresh request may not have
+        # been flushed to the database yet.
+        original_audit_log = ai_wish_generator.get_pending_audit_entry(
+            request.request_id, owner_user_id=owner_user_id
+        ) or await db_manager.get_ai_wish_audit_log_by_request_id(
             request.request_id, owner_user_id=owner_user_id
         )
         
@@ -3,7 +3,7 @@ Database models for the Church Anniversary & Birthday Helper app.
 """
 from datetime import datetime, date
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from enum import Enum
 
 
@@ -73,8 +73,7 @@ class Person(PersonBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 class MessageLog(BaseModel):
@@ -88,8 +87,7 @@ class MessageLog(BaseModel):
     error_message: Optional[str] = None
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 class CSVUpload(BaseModel):
@@ -105,8 +103,7 @@ class CSVUpload(BaseModel):
     error_message: Optional[str] = None
     storage_path: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 def _default_notification_channels() -> List["NotificationChannel"]:
@@ -154,8 +151,7 @@ class NotificationPreferences(NotificationPreferencesBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserBase(BaseModel):
@@ -205,8 +201,7 @@ class User(UserBase):
     updated_at: datetime
     last_login: Optional[datetime] = Field(None, description="Last login timestamp")
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class LoginRequest(BaseModel):
@@ -295,8 +290,7 @@ class RateLimitRecord(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Anniversary Wish API Models
@@ -330,6 +324,14 @@ class AnniversaryWishRequest(BaseModel):
     tone: ToneType = Field(ToneType.WARM, description="Tone of the wish message")
     context: Optional[str] = Field(None, description="Additional context for personalization", max_length=500)
 
+    @field_validator("name", "relationship")
+    @classmethod
+    def require_non_blank(cls, value: str) -> str:
+        """Reject whitespace-only values before they reach an AI provider."""
+        if not value.strip():
+            raise ValueError("must not be blank")
+        return value
+
 
 class AnniversaryWishResponse(BaseModel):
     """Model for anniversary wish generation responses."""
@@ -364,11 +366,10 @@ class AIWishAuditLog(BaseModel):
     ip_address: str = Field(..., description="Client IP address (hashed)")
     request_data: Dict[str, Any] = Field(..., description="JSON data of the original request")
     response_data: Dict[str, Any] = Field(..., description="JSON data of the generated response")
-    ai_service_used: str = Field(..., description="AI service used: groq, openai, or fallback")
+    ai_service_used: str = Field(..., description="AI service used: groq, openai, cache, or fallback")
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class AIWishAuditLogCreate(BaseModel):
@@ -382,4 +383,4 @@ class AIWishAuditLogCreate(BaseModel):
     ip_address: str = Field(..., description="Client IP address (hashed)")
     request_data: Dict[str, Any] = Field(..., description="JSON data of the original request")
     response_data: Dict[str, Any] = Field(..., description="JSON data of the generated response")
-    ai_service_used: str = Field(..., description="AI service used: groq, openai, or fallback")
+    ai_service_used: str = Field(..., description="AI service used: groq, openai, cache, or fallback")
@@ -2,7 +2,7 @@
 Rate limiting service for API endpoints.
 """
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, Tuple
 from fastapi import HTTPException, status
 
@@ -12,6 +12,14 @@ from app.config import settings
 logger = logging.getLogger(__name__)
 
 
+def _parse_timestamp(value: str) -> datetime:
+    """Parse a stored timestamp, treating values without an offset as UTC."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
 class RateLimitService:
     """Service for handling API rate limiting."""
 
@@ -35,60 +43,24 @@ class RateLimitService:
             - rate_limit_info: Dict containing remaining requests, reset time, etc.
         """
         try:
-            # Get existing rate limit record
-            record = await db_manager.get_rate_limit_record(ip_address)
-            now = datetime.now()
-
-            if not record:
-                # First request from this IP - create new record
-                await db_manager.create_rate_limit_record(ip_address)
-                return True, {
-                    "remaining_requests": self.max_requests - 1,
-                    "window_reset_time": now + timedelta(seconds=self.window_seconds),
-                    "request_count": 1
-                }
-
-            # Parse existing record
-            window_start = datetime.fromisoformat(record["window_start"].replace('Z', '+00:00'))
-            request_count = record["request_count"]
-            last_request_time = datetime.fromisoformat(record["last_request_time"].replace('Z', '+00:00'))
-
-            # Check if we're still within the current window
-            time_since_window_start = (now - window_start).total_seconds()
-
-            if time_since_window_start >= self.window_seconds:
-                # Window has expired - reset the counter
-                await db_manager.reset_rate_limit_window(ip_address)
-                return True, {
-                    "remaining_requests": self.max_requests - 1,
-                    "window_reset_time": now + timedelta(seconds=self.window_seconds),
-                    "request_count": 1
-                }
+            record = await db_manager.check_and_increment_rate_limit(
+                ip_address, self.max_requests, self.window_seconds
+            )
+            window_reset_time = _parse_timestamp(record["window_start"]) + timedelta(seconds=self.window_seconds)
 
-            # Check if we've exceeded the rate limit
-            if request_count >= self.max_requests:
-                # Rate limit exceeded
-                time_until_reset = self.window_seconds - time_since_window_start
+            if not record["allowed"]:
+                time_until_reset = (window_reset_time - datetime.now(timezone.utc)).total_seconds()
                 return False, {
                     "remaining_requests": 0,
-                    "window_reset_time": window_start + timedelta(seconds=self.window_seconds),
-                    "request_count": request_count,
-                    "retry_after_seconds": int(time_until_reset)
+                    "window_reset_time": window_reset_time,
+                    "request_count": self.max_requests,
+                    "retry_after_seconds": max(0, int(time_until_reset))
                 }
 
-            # Increment the request count
-            new_request_count = request_count + 1
-            await db_manager.update_rate_limit_record(
-                ip_address, 
-                new_request_count, 
-                window_start, 
-                now
-            )
-
             return True, {
-                "remaining_requests": self.max_requests - new_request_count,
-                "window_reset_time": window_start + timedelta(seconds=self.window_seconds),
-                "request_count": new_request_count
+                "remaining_requests": self.max_requests - record["request_count"],
+                "window_reset_time": window_reset_time,
+                "request_count": record["request_count"]
             }
 
         except Exception as e:
@@ -113,7 +85,7 @@ class RateLimitService:
         """
         try:
             record = await db_manager.get_rate_limit_record(ip_address)
-            now = datetime.now()
+            now = datetime.now(timezone.utc)
 
             if not record:
                 return {
@@ -123,8 +95,9 @@ class RateLimitService:
                 }
 
             # Parse existing record
-            window_start = datetime.fromisoformat(record["window_start"].replace('Z', '+00:00'))
-            request_count = record["request_count"]
+            window_start = _parse_timestamp(record["window_start"])
+            # Denied requests leave the stored count one past the limit
+            request_count = min(record["request_count"], self.max_requests)
 
             # Check if we're still within the current window
             time_since_window_start = (now - window_start).total_seconds()
@@ -1,13 +1,15 @@
 """
 Service layer for business logic and external integrations.
 """
+import asyncio
 import logging
 import pandas as pd
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 import re
 import random
 import io
+from io import BufferedReader
 import tempfile
 import smtplib
 from email.message import EmailMessage
@@ -44,22 +46,26 @@ class StorageManager:
         
     async def upload_csv_file(
         self,
-        file_content: bytes,
+        file_content: Union[bytes, BufferedReader],
         filename: str,
         *,
         owner_user_id: int,
     ) -> Dict[str, Any]:
         """Upload a CSV file to Supabase Storage under the owner's prefix.
 
-        The object path embeds ``owner_user_id`` so listing/deleting can be
-        scoped to the caller by prefix.
+        ``file_content`` may be the bytes or a file opened in ``"rb"`` mode;
+        a file is streamed from disk rather than read into memory. The object
+        path embeds ``owner_user_id`` so listing/deleting can be scoped to the
+        caller by prefix.
         """
         try:
             timestamp = datetime.now().isoformat()
             file_path = f"uploads/{owner_user_id}/{timestamp}_{filename}"
             
-            # Upload to Supabase Storage
-            response = self.storage_client.storage.from_(self.bucket_name).upload(
+            # Upload to Supabase Storage; the client is blocking, so keep it
+            # off the event loop
+            response = await asyncio.to_thread(
+                self.storage_client.storage.from_(self.bucket_name).upload,
                 path=file_path,
                 file=file_content,
                 file_options={"content-type": "text/csv"}
@@ -175,13 +181,100 @@ class CSVManager:
 
         return errors
 
-    async def process_csv_file(self, file_path: str, *, owner_user_id: int) -> Dict[str, Any]:
-        """Process a CSV file from Supabase Storage into the owner's row set."""
+    @staticmethod
+    def _normalize_rows(df: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+        """Clean CSV columns in bulk and return PersonCreate kwargs keyed by row index.
+
+        Rows whose ``year`` is present but not a number are logged and left out.
+        """
+        def optional_text(column: str) -> pd.Series:
+            if column not in df.columns:
+                return pd.Series(None, index=df.index, dtype=object)
+            values = df[column]
+            present = values.notna() & (values != '')
+            return values.astype(str).str.strip().where(present, None)
+
+        frame = pd.DataFrame({
+            'name': df['name'].astype(str).str.strip(),
+            'event_type': df['type'].astype(str).str.lower().str.strip(),
+            'event_date': df['date'].astype(str).str.strip(),
+            'spouse': optional_text('spouse'),
+            'phone_number': optional_text('phone_number'),
+        }, index=df.index)
+
+        raw_year = optional_text('year')
+        year = pd.to_numeric(raw_year, errors='coerce')
+        bad_year = raw_year.notna() & (year.isna() | (year % 1 != 0))
+        for index in df.index[bad_year]:
+            logger.error(f"Error processing row {index}: invalid year {raw_year[index]!r}")
+        frame['year'] = year.where(~bad_year).astype('Int64')
+        frame = frame[~bad_year]
+
+        frame = frame.astype(object).where(frame.notna(), None)
+        return frame.to_dict('index')
+
+    async def _upsert_people_in_chunks(
+        self,
+        people: List[PersonCreate],
+        *,
+        owner_user_id: int,
+    ) -> List[PersonCreate]:
+        """Upsert people in bounded batches and return the ones that were saved.
+
+        Batches are sent concurrently, at most ``csv_upsert_concurrency`` at a
+        time. If a batch is rejected, its rows are retried one at a time so a
+        single bad row is skipped instead of failing the whole import.
+        """
+        # Collapse duplicate keys up front (last row wins) so concurrent
+        # batches never race on the same person
+        people = list({(p.name, p.event_type): p for p in people}.values())
+        batch_size = max(1, settings.csv_upsert_batch_size)
+        semaphore = asyncio.Semaphore(max(1, settings.csv_upsert_concurrency))
+
+        async def upsert_chunk(chunk: List[PersonCreate]) -> List[PersonCreate]:
+            async with semaphore:
+                try:
+                    await db_manager.bulk_upsert_people(chunk, owner_user_id=owner_user_id)
+                    return chunk
+                except Exception as e:
+                    logger.warning(f"Batch upsert of {len(chunk)} people failed, retrying row by row: {e}")
+
+                saved_rows: List[PersonCreate] = []
+                for person_data in chunk:
+                    try:
+                        await db_manager.bulk_upsert_people([person_data], owner_user_id=owner_user_id)
+                        saved_rows.append(person_data)
+                    except Exception as e:
+                        logger.error(f"Error saving {person_data.name} ({person_data.event_type.value}): {e}")
+                return saved_rows
+
+        results = await asyncio.gather(*(
+            upsert_chunk(people[start:start + batch_size])
+            for start in range(0, len(people), batch_size)
+        ))
+        return [person_data for saved_rows in results for person_data in saved_rows]
+
+    async def process_csv_file(
+        self,
+        file_path: str,
+        *,
+        owner_user_id: int,
+        local_path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Process a CSV file from Supabase Storage into the owner's row set.
+
+        When the caller still has the uploaded file on disk it passes
+        ``local_path`` and the CSV is read from there instead of being
+        downloaded again; ``file_path`` is still what the upload is logged as.
+        """
         try:
-            # Download file from Supabase Storage
-            file_content = await storage_manager.download_csv_file(file_path)
-            # Read CSV from bytes
-            df = pd.read_csv(io.BytesIO(file_content))
+            if local_path is not None:
+                source = local_path
+            else:
+                # Download file from Supabase Storage
+                source = io.BytesIO(await storage_manager.download_csv_file(file_path))
+            # Read every column as text so phone numbers keep leading '+' and zeros
+            df = pd.read_csv(source, dtype=str)
 
             # Validate format
             validation_errors = self.validate_csv_format(df)
@@ -204,39 +297,22 @@ class CSVManager:
                 (p.name, p.event_type): p for p in existing_people
             }
 
-            # Process each row
-            for index, row in df.iterrows():
+            # Validate each row, then write them in batched upserts
+            people_to_upsert: List[PersonCreate] = []
+            for index, record in self._normalize_rows(df).items():
                 try:
-                    name = str(row['name']).strip()
-                    event_type = EventType(row['type'].lower().strip())
-                    event_date = str(row['date']).strip()
-                    year = int(row['year']) if pd.notna(row.get('year')) and row.get('year') != '' else None
-                    spouse = str(row['spouse']).strip() if pd.notna(row.get('spouse')) and row.get('spouse') != '' else None
-                    phone_number = str(row['phone_number']).strip() if pd.notna(row.get('phone_number')) and row.get('phone_number') != '' else None
-
-                    person_data = PersonCreate(
-                        name=name,
-                        event_type=event_type,
-                        event_date=event_date,
-                        year=year,
-                        spouse=spouse,
-                        phone_number=phone_number,
-                        active=True
-                    )
-
-                    existing_person = existing_by_key.get((name, event_type))
-
-                    await db_manager.upsert_person(person_data, owner_user_id=owner_user_id)
-
-                    if existing_person:
-                        records_updated += 1
-                    else:
-                        records_added += 1
-
+                    people_to_upsert.append(PersonCreate(active=True, **record))
                 except Exception as e:
                     logger.error(f"Error processing row {index}: {e}")
                     continue
 
+            saved_people = await self._upsert_people_in_chunks(people_to_upsert, owner_user_id=owner_user_id)
+            for person_data in saved_people:
+                if (person_data.name, person_data.event_type) in existing_by_key:
+                    records_updated += 1
+                else:
+                    records_added += 1
+
             # Log the CSV upload to database
             try:
                 await db_manager.log_csv_upload(
@@ -350,6 +426,51 @@ class DateManager:
         return celebration_info
 
 
+# Bible verses suitable for celebrations
+_BIBLE_VERSES: Tuple[Dict[str, str], ...] = (
+    {
+        "verse": "For I know the plans I have for you, declares the Lord, plans to prosper you and not to harm you, to give you hope and a future.",
+        "reference": "Jeremiah 29:11"
+    },
+    {
+        "verse": "The Lord bless you and keep you; the Lord make his face shine on you and be gracious to you.",
+        "reference": "Numbers 6:24-25"
+    },
+    {
+        "verse": "This is the day the Lord has made; let us rejoice and be glad in it.",
+        "reference": "Psalm 118:24"
+    },
+    {
+        "verse": "Every good and perfect gift is from above, coming down from the Father of the heavenly lights.",
+        "reference": "James 1:17"
+    },
+    {
+        "verse": "The Lord your God is with you, the Mighty Warrior who saves. He will take great delight in you; in his love he will no longer rebuke you, but will rejoice over you with singing.",
+        "reference": "Zephaniah 3:17"
+    },
+    {
+        "verse": "Love is patient, love is kind. It does not envy, it does not boast, it is not proud.",
+        "reference": "1 Corinthians 13:4"
+    },
+    {
+        "verse": "Two are better than one, because they have a good return for their labor.",
+        "reference": "Ecclesiastes 4:9"
+    },
+    {
+        "verse": "Above all else, guard your heart, for everything you do flows from it.",
+        "reference": "Proverbs 4:23"
+    },
+    {
+        "verse": "Delight yourself in the Lord, and he will give you the desires of your heart.",
+        "reference": "Psalm 37:4"
+    },
+    {
+        "verse": "And we know that in all things God works for the good of those who love him.",
+        "reference": "Romans 8:28"
+    },
+)
+
+
 class AIMessageGenerator:
     """Generates Christian-themed celebration messages using AI."""
 
@@ -372,50 +493,9 @@ class AIMessageGenerator:
             except Exception as e:
                 logger.warning(f"Failed to initialize OpenAI client: {e}")
 
-    def get_bible_verses(self) -> List[Dict[str, str]]:
+    def get_bible_verses(self) -> Tuple[Dict[str, str], ...]:
         """Get a collection of Bible verses suitable for celebrations."""
-        return [
-            {
-                "verse": "For I know the plans I have for you, declares the Lord, plans to prosper you and not to harm you, to give you hope and a future.",
-                "reference": "Jeremiah 29:11"
-            },
-            {
-                "verse": "The Lord bless you and keep you; the Lord make his face shine on you and be gracious to you.",
-                "reference": "Numbers 6:24-25"
-            },
-            {
-                "verse": "This is the day the Lord has made; let us rejoice and be glad in it.",
-                "reference": "Psalm 118:24"
-            },
-            {
-                "verse": "Every good and perfect gift is from above, coming down from the Father of the heavenly lights.",
-                "reference": "James 1:17"
-            },
-            {
-                "verse": "The Lord your God is with you, the Mighty Warrior who saves. He will take great delight in you; in his love he will no longer rebuke you, but will rejoice over you with singing.",
-                "reference": "Zephaniah 3:17"
-            },
-            {
-                "verse": "Love is patient, love is kind. It does not envy, it does not boast, it is not proud.",
-                "reference": "1 Corinthians 13:4"
-            },
-            {
-                "verse": "Two are better than one, because they have a good return for their labor.",
-                "reference": "Ecclesiastes 4:9"
-            },
-            {
-                "verse": "Above all else, guard your heart, for everything you do flows from it.",
-                "reference": "Proverbs 4:23"
-            },
-            {
-                "verse": "Delight yourself in the Lord, and he will give you the desires of your heart.",
-                "reference": "Psalm 37:4"
-            },
-            {
-                "verse": "And we know that in all things God works for the good of those who love him.",
-                "reference": "Romans 8:28"
-            }
-        ]
+        return _BIBLE_VERSES
 
     async def generate_message_with_groq(self, celebration_info: Dict[str, Any]) -> Optional[str]:
         """Generate message using Groq API."""
@@ -522,8 +602,7 @@ class AIMessageGenerator:
         age_or_years = celebration_info.get("age_or_years")
 
         # Select a random Bible verse
-        bible_verses = self.get_bible_verses()
-        selected_verse = random.choice(bible_verses)
+        selected_verse = random.choice(_BIBLE_VERSES)
 
         if event_type == "birthday":
             if age_or_years:
@@ -758,7 +837,9 @@ class CoordinatorNotifier:
                     recipient = user.email
 
                 try:
-                    results.append(self._send_to_channel(channel, recipient, delivery_subject, message))
+                    results.append(
+                        await asyncio.to_thread(self._send_to_channel, channel, recipient, delivery_subject, message)
+                    )
                 except Exception as channel_error:
                     logger.error("Error sending user message via %s for user %s: %s", channel, user.id, channel_error)
                     results.append({
@@ -802,7 +883,9 @@ class CoordinatorNotifier:
             if channel in {"sms", "whatsapp"}:
                 if not person.phone_number:
                     raise ValueError(f"{person.name} does not have a phone number configured")
-                result = self._send_to_channel(channel, person.phone_number, f"Celebrating {person.name}", message)
+                result = await asyncio.to_thread(
+                    self._send_to_channel, channel, person.phone_number, f"Celebrating {person.name}", message
+                )
             else:
                 raise ValueError(f"Direct delivery channel {channel} is not supported for contacts yet")
 
@@ -862,9 +945,13 @@ class CoordinatorNotifier:
                 }
 
             if user.notification_preference == NotificationPreference.DIRECT_TO_CONTACTS:
-                results = []
-                for person in celebrations:
-                    results.append(await self.send_direct_celebration_message(user, person))
+                semaphore = asyncio.Semaphore(max(1, settings.celebration_send_concurrency))
+
+                async def send_one(person: Person) -> Dict[str, Any]:
+                    async with semaphore:
+                        return await self.send_direct_celebration_message(user, person)
+
+                results = await asyncio.gather(*(send_one(person) for person in celebrations))
 
                 success_count = sum(1 for result in results if result.get("success"))
                 return {
@@ -881,15 +968,19 @@ class CoordinatorNotifier:
             subject = f"Daily celebration message for {date.today().isoformat()}"
             result = await self.send_message_to_user(user, consolidated_message, subject=subject)
 
-            for person in celebrations:
-                await db_manager.log_message(
-                    person_id=person.id,
-                    message_content=consolidated_message,
-                    sent_date=date.today(),
-                    success=result["success"],
-                    error_message=result.get("error"),
-                    owner_user_id=user.id,
-                )
+            await db_manager.log_messages_bulk(
+                [
+                    {
+                        "person_id": person.id,
+                        "message_content": consolidated_message,
+                        "sent_date": date.today(),
+                        "success": result["success"],
+                        "error_message": result.get("error"),
+                    }
+                    for person in celebrations
+                ],
+                owner_user_id=user.id,
+            )
 
             if result["success"]:
                 return {
@@ -942,14 +1033,17 @@ class CoordinatorNotifier:
             if user.notification_preference == NotificationPreference.PERSONAL_REMINDER
         ]
 
-        results = []
+        semaphore = asyncio.Semaphore(max(1, settings.celebration_send_concurrency))
 
-        for user in personal_reminder_users:
-            results.append({
-                "user_id": user.id,
-                "username": user.username,
-                "result": await self.send_daily_celebrations_for_user(user),
-            })
+        async def run_for_user(user: User) -> Dict[str, Any]:
+            async with semaphore:
+                return {
+                    "user_id": user.id,
+                    "username": user.username,
+                    "result": await self.send_daily_celebrations_for_user(user),
+                }
+
+        results = list(await asyncio.gather(*(run_for_user(user) for user in personal_reminder_users)))
 
         if direct_delivery_users:
             selected_user = direct_delivery_users[0]
@@ -1009,8 +1103,7 @@ class CoordinatorNotifier:
             message_parts.append("")
 
             # Add Bible verse
-            bible_verses = ai_generator.get_bible_verses()
-            selected_verse = random.choice(bible_verses)
+            selected_verse = random.choice(_BIBLE_VERSES)
             message_parts.append(f'"{selected_verse["verse"]}" - {selected_verse["reference"]}')
             message_parts.append("")
 
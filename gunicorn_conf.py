@@ -0,0 +1,43 @@
+"""
+Gunicorn configuration: several Uvicorn workers behind one master process.
+
+Start with ``gunicorn app.main:app -c gunicorn_conf.py``. ``WEB_CONCURRENCY``
+overrides the worker count and ``PORT`` the listening port.
+"""
+import fcntl
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+# Workers read this to turn off per-process caches that can't see each
+# other's invalidations
+os.environ["WEB_CONCURRENCY"] = str(workers)
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+# Every worker runs the app's lifespan, but the daily celebration job must only
+# be scheduled once. Workers race for an exclusive lock after forking; the
+# holder runs the scheduler and keeps the lock until it exits, at which point
+# its replacement picks it up. Setting SCHEDULER_ENABLED=false beforehand
+# (e.g. when the cron hook drives delivery) turns it off in every worker.
+SCHEDULER_LOCK_PATH = os.path.join(tempfile.gettempdir(), "anniversary-helper-scheduler.lock")
+_scheduler_lock = None
+
+
+def post_fork(server, worker):
+    global _scheduler_lock
+    if os.getenv("SCHEDULER_ENABLED", "true").lower() == "false":
+        return
+
+    lock_file = open(SCHEDULER_LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        os.environ["SCHEDULER_ENABLED"] = "false"
+        return
+
+    _scheduler_lock = lock_file
+    os.environ["SCHEDULER_ENABLED"] = "true"
+    server.log.info("Worker %s runs the celebration scheduler", worker.pid)
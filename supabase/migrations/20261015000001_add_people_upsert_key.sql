@@ -0,0 +1,69 @@
+-- Migration: Make (owner_user_id, name, event_type) the people upsert key
+-- Description: Replaces the partial unique index on active rows with a full
+-- unique index so PostgREST can target it with ON CONFLICT. Bulk CSV imports
+-- then upsert every row in a single request instead of a SELECT plus an
+-- INSERT/UPDATE per person. ON CONFLICT cannot infer a partial index, which is
+-- why the active-only index from the tenancy migration is not enough.
+
+-- 1. Collapse remaining duplicates. The tenancy migration soft-deleted older
+--    copies, so a key can still have one active row plus inactive ones. Keep
+--    the active row (or the freshest inactive one) and repoint message history
+--    at it. The other copies are moved, unchanged, into
+--    people_merged_duplicates with the id they were merged into, so the
+--    soft-deleted history is kept rather than discarded.
+
+CREATE TABLE IF NOT EXISTS people_merged_duplicates (
+    LIKE people,
+    merged_into_id INTEGER NOT NULL,
+    merged_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE people_merged_duplicates IS
+    'People rows merged into another row with the same (owner_user_id, name, event_type) upsert key';
+
+DO $$
+DECLARE
+    merged INTEGER;
+BEGIN
+    CREATE TEMP TABLE people_duplicates ON COMMIT DROP AS
+    WITH ranked AS (
+        SELECT id,
+               FIRST_VALUE(id) OVER (
+                   PARTITION BY owner_user_id, name, event_type
+                   ORDER BY active DESC, updated_at DESC NULLS LAST, id DESC
+               ) AS keep_id
+        FROM people
+    )
+    SELECT id, keep_id FROM ranked WHERE id <> keep_id;
+
+    INSERT INTO people_merged_duplicates
+    SELECT people.*, people_duplicates.keep_id, NOW()
+    FROM people
+    JOIN people_duplicates ON people_duplicates.id = people.id;
+
+    UPDATE message_logs
+    SET person_id = people_duplicates.keep_id
+    FROM people_duplicates
+    WHERE message_logs.person_id = people_duplicates.id;
+
+    DELETE FROM people
+    USING people_duplicates
+    WHERE people.id = people_duplicates.id;
+
+    GET DIAGNOSTICS merged = ROW_COUNT;
+    IF merged > 0 THEN
+        RAISE NOTICE
+            'Moved % duplicate people row(s) to people_merged_duplicates so the upsert key can be enforced',
+            merged;
+    END IF;
+END
+$$;
+
+-- 2. Enforce the upsert key on every row, active or not. Re-importing or
+--    re-creating a soft-deleted person reactivates the existing row instead of
+--    adding a copy; DatabaseManager.create_person upserts for that reason.
+
+CREATE UNIQUE INDEX IF NOT EXISTS uniq_people_owner_name_event_type
+    ON people(owner_user_id, name, event_type);
+
+DROP INDEX IF EXISTS uniq_people_owner_name_event_type_active;
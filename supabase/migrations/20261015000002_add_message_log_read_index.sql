@@ -0,0 +1,8 @@
+-- Migration: Index for the message log read path
+-- Description: get_all_message_logs pages an owner's logs newest first by id,
+-- so index (owner_user_id, id DESC) to make each page an index range scan.
+-- get_people_by_date is already served by idx_people_owner_user_event_date
+-- from the tenancy migration.
+
+CREATE INDEX IF NOT EXISTS idx_message_logs_owner_user_id_desc
+    ON message_logs(owner_user_id, id DESC);
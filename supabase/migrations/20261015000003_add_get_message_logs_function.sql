@@ -0,0 +1,48 @@
+-- Migration: Server-side message log listing
+-- Description: get_all_message_logs used to fetch message_logs with an embedded
+-- people(...) resource and flatten every row in Python. This function does the
+-- join in Postgres and returns rows already in the API shape, one page at a
+-- time. Pages are keyed on id (newest first): pass the last id of a page as
+-- p_before_id to fetch the next, or NULL for the first page. The scan is
+-- served by idx_message_logs_owner_user_id_desc.
+
+CREATE OR REPLACE FUNCTION get_message_logs(
+    p_owner_user_id INTEGER,
+    p_before_id INTEGER DEFAULT NULL,
+    p_limit INTEGER DEFAULT 200
+)
+RETURNS TABLE (
+    id INTEGER,
+    owner_user_id INTEGER,
+    person_id INTEGER,
+    message_content TEXT,
+    sent_date DATE,
+    success BOOLEAN,
+    error_message TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    person_name VARCHAR,
+    person_event_type VARCHAR,
+    person_phone VARCHAR
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        ml.id,
+        ml.owner_user_id,
+        ml.person_id,
+        ml.message_content,
+        ml.sent_date,
+        ml.success,
+        ml.error_message,
+        ml.created_at,
+        p.name,
+        p.event_type,
+        p.phone_number
+    FROM message_logs ml
+    LEFT JOIN people p ON p.id = ml.person_id
+    WHERE ml.owner_user_id = p_owner_user_id
+      AND (p_before_id IS NULL OR ml.id < p_before_id)
+    ORDER BY ml.id DESC
+    LIMIT p_limit;
+$$;
@@ -0,0 +1,40 @@
+-- Migration: Atomic rate limit check
+-- Description: The rate limiter used to read an IP's rate_limiting row, decide
+-- in Python, then insert/update it: up to three round trips, and two workers
+-- could both read the same count and both let a request through. This function
+-- does the check and the increment in one INSERT ... ON CONFLICT statement.
+--
+-- An expired window restarts at 1. Inside the window the count is incremented
+-- but capped at p_max_requests + 1, so a request is allowed exactly when the
+-- returned request_count is <= p_max_requests.
+
+CREATE OR REPLACE FUNCTION check_rate_limit(
+    p_ip_address VARCHAR,
+    p_max_requests INTEGER,
+    p_window_seconds INTEGER
+)
+RETURNS TABLE (
+    allowed BOOLEAN,
+    request_count INTEGER,
+    window_start TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO rate_limiting AS rl (ip_address, request_count, window_start, last_request_time)
+    VALUES (p_ip_address, 1, NOW(), NOW())
+    ON CONFLICT (ip_address) DO UPDATE SET
+        request_count = CASE
+            WHEN rl.window_start <= NOW() - make_interval(secs => p_window_seconds) THEN 1
+            ELSE LEAST(rl.request_count + 1, p_max_requests + 1)
+        END,
+        window_start = CASE
+            WHEN rl.window_start <= NOW() - make_interval(secs => p_window_seconds) THEN NOW()
+            ELSE rl.window_start
+        END,
+        last_request_time = NOW(),
+        updated_at = NOW()
+    RETURNING rl.request_count <= p_max_requests, rl.request_count, rl.window_start;
+$$;
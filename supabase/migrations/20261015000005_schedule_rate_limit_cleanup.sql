@@ -0,0 +1,20 @@
+-- Migration: Purge idle rate limit rows on a schedule
+-- Description: Nothing in the app ever removed rate_limiting rows. Run the
+-- cleanup in the database every 15 minutes with pg_cron instead of from a
+-- request path. Rows are purged once an IP has been idle for 24 hours, keyed
+-- on last_request_time rather than created_at: check_rate_limit keeps
+-- reusing an IP's row, so created_at says nothing about whether its current
+-- window is still live.
+
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+
+CREATE INDEX IF NOT EXISTS idx_rate_limiting_last_request_time
+    ON rate_limiting(last_request_time);
+
+-- cron.schedule replaces an existing job with the same name, so this is
+-- safe to re-run.
+SELECT cron.schedule(
+    'purge-idle-rate-limits',
+    '*/15 * * * *',
+    $$DELETE FROM public.rate_limiting WHERE last_request_time < NOW() - INTERVAL '24 hours'$$
+);
@@ -0,0 +1,36 @@
+-- Migration: Stamp updated_at in the database
+-- Description: Every update payload used to carry an updated_at computed in
+-- Python. A BEFORE UPDATE trigger now sets it from the database clock on each
+-- mutable table, so writers leave it out. Upserts are covered too: the
+-- ON CONFLICT DO UPDATE path fires BEFORE UPDATE triggers, and fresh inserts
+-- take the column's DEFAULT NOW().
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS set_people_updated_at ON people;
+CREATE TRIGGER set_people_updated_at
+    BEFORE UPDATE ON people
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS set_users_updated_at ON users;
+CREATE TRIGGER set_users_updated_at
+    BEFORE UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS set_user_notification_preferences_updated_at ON user_notification_preferences;
+CREATE TRIGGER set_user_notification_preferences_updated_at
+    BEFORE UPDATE ON user_notification_preferences
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS set_rate_limiting_updated_at ON rate_limiting;
+CREATE TRIGGER set_rate_limiting_updated_at
+    BEFORE UPDATE ON rate_limiting
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
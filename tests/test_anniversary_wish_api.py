@@ -8,7 +8,7 @@ from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
 
 from app.main import app
-from app.models import AnniversaryWishRequest, AnniversaryType, ToneType
+from app.models import AnniversaryWishRequest, AnniversaryType, ToneType, AIWishAuditLogCreate
 from app.rate_limiter import rate_limit_service
 from app.ai_wish_generator import ai_wish_generator
 
@@ -127,6 +127,24 @@ class TestAnniversaryWishAPI:
         assert minimal_request.tone == ToneType.WARM  # Default tone
         assert minimal_request.context is None
 
+    def test_anniversary_wish_request_rejects_blank_fields(self):
+        """Test that whitespace-only names and relationships are rejected."""
+        from pydantic import ValidationError
+
+        with pytest.raises(ValidationError):
+            AnniversaryWishRequest(
+                name="   ",
+                anniversary_type=AnniversaryType.BIRTHDAY,
+                relationship="friend",
+            )
+
+        with pytest.raises(ValidationError):
+            AnniversaryWishRequest(
+                name="John",
+                anniversary_type=AnniversaryType.BIRTHDAY,
+                relationship="\t",
+            )
+
 
 class TestRateLimitService:
     """Test cases for the RateLimitService."""
@@ -135,53 +153,42 @@ class TestRateLimitService:
     async def test_check_rate_limit_new_ip(self):
         """Test rate limit check for new IP address."""
         from app.database import db_manager
-        
-        with patch.object(db_manager, 'get_rate_limit_record', return_value=None), \
-             patch.object(db_manager, 'create_rate_limit_record', return_value={}):
-            
+
+        record = {"allowed": True, "request_count": 1, "window_start": datetime.now().isoformat()}
+        with patch.object(db_manager, 'check_and_increment_rate_limit', AsyncMock(return_value=record)) as check:
+
             is_allowed, rate_info = await rate_limit_service.check_rate_limit("192.168.1.1")
-            
+
             assert is_allowed is True
             assert rate_info["remaining_requests"] == 2  # 3 - 1
+            check.assert_awaited_once_with("192.168.1.1", 3, 3 * 3600)
 
     @pytest.mark.asyncio
     async def test_check_rate_limit_existing_ip_within_limit(self):
         """Test rate limit check for existing IP within limit."""
-        mock_record = {
-            "ip_address": "192.168.1.1",
-            "request_count": 1,
-            "window_start": datetime.now().isoformat(),
-            "last_request_time": datetime.now().isoformat()
-        }
-        
         from app.database import db_manager
-        
-        with patch.object(db_manager, 'get_rate_limit_record', return_value=mock_record), \
-             patch.object(db_manager, 'update_rate_limit_record', return_value=True):
-            
+
+        record = {"allowed": True, "request_count": 2, "window_start": datetime.now().isoformat()}
+        with patch.object(db_manager, 'check_and_increment_rate_limit', AsyncMock(return_value=record)):
+
             is_allowed, rate_info = await rate_limit_service.check_rate_limit("192.168.1.1")
-            
+
             assert is_allowed is True
             assert rate_info["remaining_requests"] == 1  # 3 - 2
 
     @pytest.mark.asyncio
     async def test_check_rate_limit_exceeded(self):
         """Test rate limit check when limit is exceeded."""
-        mock_record = {
-            "ip_address": "192.168.1.1",
-            "request_count": 3,
-            "window_start": datetime.now().isoformat(),
-            "last_request_time": datetime.now().isoformat()
-        }
-        
         from app.database import db_manager
-        
-        with patch.object(db_manager, 'get_rate_limit_record', return_value=mock_record):
-            
+
+        record = {"allowed": False, "request_count": 4, "window_start": datetime.now().isoformat() + "+00:00"}
+        with patch.object(db_manager, 'check_and_increment_rate_limit', AsyncMock(return_value=record)):
+
             is_allowed, rate_info = await rate_limit_service.check_rate_limit("192.168.1.1")
-            
+
             assert is_allowed is False
             assert rate_info["remaining_requests"] == 0
+            assert rate_info["request_count"] == 3
             assert "retry_after_seconds" in rate_info
 
 
@@ -200,6 +207,17 @@ class TestAIWishGenerator:
         assert generator.get_relationship_context("best friend") == "as their dear friend"
         assert generator.get_relationship_context("custom relationship") == "as their custom relationship"
 
+    def test_get_relationship_context_partial_matches(self):
+        """Test partial relationship matches in both directions."""
+        from app.ai_wish_generator import AIWishGenerator
+
+        # Key contained in the input; earlier keys win over later ones
+        assert AIWishGenerator.get_relationship_context("Loving Husband") == "as their loving husband"
+        assert AIWishGenerator.get_relationship_context("grandparent") == "as their parent"
+        assert AIWishGenerator.get_relationship_context("father's friend") == "as their father"
+        # Input contained in a key
+        assert AIWishGenerator.get_relationship_context("bro") == "as their brother"
+
     def test_get_anniversary_type_context(self):
         """Test anniversary type context generation."""
         from app.ai_wish_generator import AIWishGenerator
@@ -258,6 +276,276 @@ class TestAIWishGenerator:
         assert "Happy Anniversary!" in clean_message
         assert "moments worth celebrating" in clean_message
 
+    @pytest.mark.asyncio
+    async def test_hedged_generation_uses_openai_when_groq_is_slow(self):
+        """Test that a slow Groq call is hedged with OpenAI and cancelled."""
+        from app.ai_wish_generator import AIWishGenerator
+
+        generator = AIWishGenerator()
+        generator.openai_client = Mock()
+        groq_cancelled = asyncio.Event()
+
+        async def slow_groq(request, contexts=None):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                groq_cancelled.set()
+                raise
+
+        async def fast_openai(request, contexts=None):
+            return "Happy anniversary from OpenAI!"
+
+        request = AnniversaryWishRequest(
+            name="John",
+            anniversary_type=AnniversaryType.BIRTHDAY,
+            relationship="friend",
+        )
+
+        with patch.object(generator, "generate_wish_with_groq", slow_groq), \
+             patch.object(generator, "generate_wish_with_openai", fast_openai), \
+             patch("app.ai_wish_generator.settings.ai_hedge_delay_seconds", 0.01):
+            wish, service = await generator._generate_with_hedging(request)
+            await asyncio.sleep(0)
+
+        assert wish == "Happy anniversary from OpenAI!"
+        assert service == "openai"
+        assert groq_cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_create_completion_retries_transient_errors(self):
+        """Test that timeouts are retried and the eventual response returned."""
+        import httpx
+        import groq
+        from app.ai_wish_generator import AIWishGenerator
+
+        generator = AIWishGenerator()
+        client = Mock()
+        timeout_error = groq.APITimeoutError(request=httpx.Request("POST", "https://api.groq.com"))
+        client.chat.completions.create = AsyncMock(side_effect=[timeout_error, "response"])
+
+        with patch("app.ai_wish_generator.asyncio.sleep", AsyncMock()):
+            response = await generator._create_completion(client, 8.0, model="test-model")
+
+        assert response == "response"
+        assert client.chat.completions.create.await_count == 2
+        assert client.chat.completions.create.await_args.kwargs["timeout"] == 8.0
+
+    @pytest.mark.asyncio
+    async def test_duplicate_requests_share_one_generation(self):
+        """Test that identical requests are served from the wish cache."""
+        from app.ai_wish_generator import AIWishGenerator
+
+        generator = AIWishGenerator()
+        hedged = AsyncMock(return_value=("Happy birthday, John!", "groq"))
+        request = AnniversaryWishRequest(
+            name="John",
+            anniversary_type=AnniversaryType.BIRTHDAY,
+            relationship="friend",
+        )
+
+        with patch.object(generator, "_generate_with_hedging", hedged), \
+             patch.object(generator, "_log_audit_trail", AsyncMock()) as audit:
+            wishes = await asyncio.gather(
+                generator.generate_anniversary_wish(request, "req-1", "127.0.0.1"),
+                generator.generate_anniversary_wish(request, "req-2", "127.0.0.1"),
+            )
+            await generator.generate_anniversary_wish(request, "req-3", "127.0.0.1", use_cache=False)
+
+        assert wishes == ["Happy birthday, John!", "Happy birthday, John!"]
+        assert hedged.await_count == 2
+        # Only the call that reached a provider is credited to it
+        services = sorted(call.args[5] for call in audit.await_args_list)
+        assert services == ["cache", "groq", "groq"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_an_empty_generation(self):
+        """Test that waiters don't start a second LLM call when the first one returns nothing."""
+        from app.ai_wish_generator import AIWishGenerator
+
+        generator = AIWishGenerator()
+        release = asyncio.Event()
+
+        async def slow_empty_generation(request):
+            await release.wait()
+            return None, "none"
+
+        hedged = AsyncMock(side_effect=slow_empty_generation)
+        request = AnniversaryWishRequest(
+            name="John",
+            anniversary_type=AnniversaryType.BIRTHDAY,
+            relationship="friend",
+        )
+
+        with patch.object(generator, "_generate_with_hedging", hedged):
+            callers = [asyncio.create_task(generator._generate_cached(request)) for _ in range(3)]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*callers)
+
+        assert results == [(None, "none")] * 3
+        hedged.assert_awaited_once()
+        assert generator._wish_inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_wish_cache_keeps_name_case(self):
+        """Test that names differing only in case are not served each other's wish."""
+        from app.ai_wish_generator import AIWishGenerator
+
+        generator = AIWishGenerator()
+        hedged = AsyncMock(side_effect=[("Happy birthday, john!", "groq"), ("Happy birthday, John!", "groq")])
+
+        with patch.object(generator, "_generate_with_hedging", hedged), \
+             patch.object(generator, "_log_audit_trail", AsyncMock()):
+            for name in ("john", "John"):
+                request = AnniversaryWishRequest(
+                    name=name,
+                    anniversary_type=AnniversaryType.BIRTHDAY,
+                    relationship="friend",
+                )
+                wish = await generator.generate_anniversary_wish(request, f"req-{name}", "127.0.0.1")
+                assert name in wish
+
+        assert hedged.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_groq_circuit_opens_after_repeated_failures(self):
+        """Test that Groq is skipped once the circuit breaker opens."""
+        from app.ai_wish_generator import AIWishGenerator
+
+        generator = AIWishGenerator()
+        generator.groq_client = Mock()
+        generator.groq_client.chat.completions.create = AsyncMock(side_effect=ValueError("boom"))
+        request = AnniversaryWishRequest(
+            name="John",
+            anniversary_type=AnniversaryType.BIRTHDAY,
+            relationship="friend",
+        )
+
+        with patch("app.ai_wish_generator.settings.groq_circuit_failure_threshold", 2):
+            for _ in range(3):
+                assert await generator.generate_wish_with_groq(request) is None
+
+        assert generator.groq_client.chat.completions.create.await_count == 2
+
+    def test_merge_context_keeps_recent_snippets_within_limit(self):
+        """Test that regeneration context stays bounded."""
+        from app.ai_wish_generator import _merge_context
+
+        assert _merge_context(None, " loves hiking ") == "loves hiking"
+        assert _merge_context("a | b | c | d", "e") == "b | c | d | e"
+
+        merged = _merge_context("x" * 400, "y" * 200)
+        assert merged == "y" * 200
+        assert len(_merge_context(None, "z" * 600)) == 500
+
+    @pytest.mark.asyncio
+    async def test_audit_entries_are_written_in_batches(self):
+        """Test that queued audit entries are flushed together on shutdown."""
+        from app.ai_wish_generator import AIWishGenerator
+        from app.database import db_manager
+
+        generator = AIWishGenerator()
+        request = AnniversaryWishRequest(
+            name="John",
+            anniversary_type=AnniversaryType.BIRTHDAY,
+            relationship="friend",
+        )
+
+        with patch.object(db_manager, "bulk_log_ai_wish_requests", AsyncMock(return_value=2)) as bulk, \
+             patch.object(db_manager, "log_ai_wish_request", AsyncMock()) as single, \
+             patch("app.ai_wish_generator.settings.audit_flush_interval_seconds", 5.0):
+            generator.start()
+            await generator._log_audit_trail("req-1", None, "127.0.0.1", request, "Wish one", "groq")
+            await generator._log_audit_trail("req-2", None, "127.0.0.1", request, "Wish two", "groq")
+            await generator.aclose()
+
+        single.assert_not_awaited()
+        bulk.assert_awaited_once()
+        batch = bulk.await_args.args[0]
+        assert [entry.request_id for entry in batch] == ["req-1", "req-2"]
+
+    @pytest.mark.asyncio
+    async def test_queued_audit_entry_is_visible_until_written(self):
+        """Test that a request can be found for regeneration before its audit row is flushed."""
+        from app.ai_wish_generator import AIWishGenerator
+        from app.database import db_manager
+
+        generator = AIWishGenerator()
+        request = AnniversaryWishRequest(
+            name="John",
+            anniversary_type=AnniversaryType.BIRTHDAY,
+            relationship="friend",
+        )
+
+        with patch.object(db_manager, "bulk_log_ai_wish_requests", AsyncMock(return_value=1)), \
+             patch("app.ai_wish_generator.settings.audit_flush_interval_seconds", 5.0):
+            generator.start()
+            await generator._log_audit_trail("req-1", None, "127.0.0.1", request, "Wish one", "groq", 7)
+
+            pending = generator.get_pending_audit_entry("req-1", owner_user_id=7)
+            assert pending.request_data["name"] == "John"
+            assert generator.get_pending_audit_entry("req-1") is pending
+            assert generator.get_pending_audit_entry("req-1", owner_user_id=8) is None
+
+            await generator.aclose()
+
+        assert generator.get_pending_audit_entry("req-1") is None
+
+    @pytest.mark.asyncio
+    async def test_audit_entry_is_written_before_returning_with_several_workers(self):
+        """Test that audit rows skip the queue when another worker may handle the regenerate."""
+        from app.ai_wish_generator import AIWishGenerator
+        from app.database import db_manager
+
+        generator = AIWishGenerator()
+        request = AnniversaryWishRequest(
+            name="John",
+            anniversary_type=AnniversaryType.BIRTHDAY,
+            relationship="friend",
+        )
+
+        with patch.object(db_manager, "log_ai_wish_request", AsyncMock()) as single, \
+             patch("app.ai_wish_generator.settings.web_concurrency", 3):
+            generator.start()
+            await generator._log_audit_trail("req-1", None, "127.0.0.1", request, "Wish one", "groq", 7)
+            await generator.aclose()
+
+        single.assert_awaited_once()
+        assert single.await_args.args[0].request_id == "req-1"
+        assert generator.get_pending_audit_entry("req-1") is None
+
+    @pytest.mark.asyncio
+    async def test_failed_audit_batch_is_retried(self):
+        """Test that a failed batch insert is retried, then written row by row."""
+        from app.ai_wish_generator import AIWishGenerator
+        from app.database import db_manager
+
+        generator = AIWishGenerator()
+        request = AnniversaryWishRequest(
+            name="John",
+            anniversary_type=AnniversaryType.BIRTHDAY,
+            relationship="friend",
+        )
+        batch = [
+            AIWishAuditLogCreate(
+                request_id=f"req-{i}",
+                ip_address="hashed",
+                request_data=request.model_dump(),
+                response_data={"generated_wish": "Wish"},
+                ai_service_used="groq",
+            )
+            for i in range(2)
+        ]
+
+        with patch.object(db_manager, "bulk_log_ai_wish_requests", AsyncMock(side_effect=Exception("down"))) as bulk, \
+             patch.object(db_manager, "log_ai_wish_request", AsyncMock()) as single, \
+             patch("app.ai_wish_generator.asyncio.sleep", AsyncMock()), \
+             patch("app.ai_wish_generator.settings.audit_write_max_attempts", 2):
+            await generator._write_audit_batch(batch)
+
+        assert bulk.await_count == 2
+        assert [call.args[0].request_id for call in single.await_args_list] == ["req-0", "req-1"]
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -135,6 +135,16 @@ class TestPasswordHashing:
         result = AuthenticationService.verify_password("test", malformed_hash)
         assert result is False
 
+    @pytest.mark.asyncio
+    async def test_async_hash_and_verify_round_trip(self):
+        """Test that the thread-offloaded wrappers hash and verify passwords."""
+        auth_service = AuthenticationService()
+        hashed = await auth_service.aget_password_hash("test_password_123")
+
+        assert hashed.startswith("$2b$")
+        assert await auth_service.averify_password("test_password_123", hashed) is True
+        assert await auth_service.averify_password("wrong_password_456", hashed) is False
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -181,6 +181,46 @@ class TestLoginRoute:
         assert data["user"]["username"] == "tundizzy"
         assert data["user"]["email"] == "joshua+tunde@tabcommerce.com"
 
+    def test_login_succeeds_when_last_login_update_fails(self, monkeypatch):
+        async def mock_initialize_tables():
+            return None
+
+        async def mock_get_user_by_email(email):
+            return User(
+                id=1,
+                username="tundizzy",
+                email=email,
+                full_name="Tundizzy Acct",
+                account_type=AccountType.PERSONAL,
+                role=UserRole.MEMBER,
+                password_hash="hash",
+                is_active=True,
+                created_at="2026-04-21T00:00:00",
+                updated_at="2026-04-21T00:00:00",
+            )
+
+        recorded = []
+
+        async def mock_update_user_last_login(user_id):
+            recorded.append(user_id)
+            raise Exception("database unavailable")
+
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", mock_initialize_tables)
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.get_user_by_email", mock_get_user_by_email)
+        monkeypatch.setattr("app.main.db_manager.update_user_last_login", mock_update_user_last_login)
+        monkeypatch.setattr("app.main.auth_service.verify_password", lambda plain, hashed: True)
+
+        with TestClient(app) as client:
+            response = client.post(
+                "/auth/login",
+                json={"email": "joshua+tunde@tabcommerce.com", "password": "Password12"},
+            )
+
+        assert response.status_code == 200
+        assert recorded == [1]
+
     def test_login_rejects_username_payload(self, monkeypatch):
         async def mock_initialize_tables():
             return None
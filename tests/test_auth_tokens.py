@@ -0,0 +1,54 @@
+"""
+Tests for JWT access token creation and verification.
+"""
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import AuthenticationService, _decode_token
+
+
+class TestTokenVerification:
+    """Test access token verification."""
+
+    def test_verify_token_round_trip(self):
+        """Test that a freshly created token verifies to its payload."""
+        token = AuthenticationService.create_access_token({"sub": "1", "username": "tundizzy"})
+
+        payload = AuthenticationService.verify_token(token)
+
+        assert payload["sub"] == "1"
+        assert payload["username"] == "tundizzy"
+
+    def test_repeat_verification_uses_cached_decode(self):
+        """Test that verifying the same token twice decodes it only once."""
+        token = AuthenticationService.create_access_token({"sub": "2", "username": "cached"})
+
+        AuthenticationService.verify_token(token)
+        hits_before = _decode_token.cache_info().hits
+        payload = AuthenticationService.verify_token(token)
+
+        assert _decode_token.cache_info().hits == hits_before + 1
+        # Callers get their own copy, so mutating it can't poison the cache
+        payload["username"] = "changed"
+        assert AuthenticationService.verify_token(token)["username"] == "cached"
+
+    def test_expired_token_is_rejected_even_when_cached(self):
+        """Test that expiry is enforced on every call, not just the first decode."""
+        token = AuthenticationService.create_access_token(
+            {"sub": "3", "username": "expiring"}, expires_delta=timedelta(seconds=60)
+        )
+        AuthenticationService.verify_token(token)
+
+        with patch("app.auth.time.time", return_value=time.time() + 120):
+            with pytest.raises(HTTPException) as exc_info:
+                AuthenticationService.verify_token(token)
+
+        assert exc_info.value.status_code == 401
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,10 +1,13 @@
 """
 Basic tests for the Church Anniversary & Birthday Helper application.
 """
+import asyncio
 import pytest
+import pandas as pd
 from datetime import date
-from app.models import PersonCreate, EventType
-from app.services import DateManager, AIMessageGenerator
+from unittest.mock import AsyncMock, patch
+from app.models import PersonCreate, EventType, NotificationPreference, Person, User
+from app.services import DateManager, AIMessageGenerator, CSVManager, CoordinatorNotifier
 
 
 class TestDateManager:
@@ -144,5 +147,106 @@ class TestPersonModel:
         assert person_data.active is True
 
 
+class TestCSVManager:
+    """Test CSV import persistence."""
+
+    def test_normalize_rows_cleans_columns_in_bulk(self):
+        """Test CSV cleanup: trimmed text, blank optionals as None, bad years dropped."""
+        df = pd.DataFrame({
+            "name": [" Ann ", "Bob", "Cat"],
+            "type": ["birthday", "anniversary", "birthday"],
+            "date": ["03-15", "04-01", "05-02"],
+            "year": ["1990", None, "abc"],
+            "phone_number": ["", "+0123", None],
+        })
+
+        rows = CSVManager._normalize_rows(df)
+
+        assert rows == {
+            0: {"name": "Ann", "event_type": "birthday", "event_date": "03-15",
+                "spouse": None, "phone_number": None, "year": 1990},
+            1: {"name": "Bob", "event_type": "anniversary", "event_date": "04-01",
+                "spouse": None, "phone_number": "+0123", "year": None},
+        }
+
+    @pytest.mark.asyncio
+    async def test_upsert_chunks_fall_back_to_single_rows(self):
+        """Test that a rejected batch only skips the rows the database refuses."""
+        people = [
+            PersonCreate(name=name, event_type=EventType.BIRTHDAY, event_date="03-15")
+            for name in ("Ann", "Bad", "Cat")
+        ]
+
+        async def fake_bulk_upsert(chunk, *, owner_user_id):
+            if any(person.name == "Bad" for person in chunk):
+                raise Exception("value too long")
+            return []
+
+        with patch("app.services.db_manager.bulk_upsert_people", AsyncMock(side_effect=fake_bulk_upsert)) as bulk, \
+             patch("app.services.settings.csv_upsert_batch_size", 2):
+            saved = await CSVManager()._upsert_people_in_chunks(people, owner_user_id=1)
+
+        assert [person.name for person in saved] == ["Ann", "Cat"]
+        # Batch [Ann, Bad] fails and is retried per row; batch [Cat] succeeds
+        assert [len(call.args[0]) for call in bulk.await_args_list] == [2, 1, 1, 1]
+
+    @pytest.mark.asyncio
+    async def test_upsert_chunks_collapse_duplicate_rows(self):
+        """Test that a person repeated across batches is written once, with the last row's data."""
+        people = [
+            PersonCreate(name="Ann", event_type=EventType.BIRTHDAY, event_date="03-15"),
+            PersonCreate(name="Bob", event_type=EventType.BIRTHDAY, event_date="04-01"),
+            PersonCreate(name="Ann", event_type=EventType.BIRTHDAY, event_date="05-20"),
+        ]
+
+        with patch("app.services.db_manager.bulk_upsert_people", AsyncMock(return_value=[])) as bulk, \
+             patch("app.services.settings.csv_upsert_batch_size", 1):
+            saved = await CSVManager()._upsert_people_in_chunks(people, owner_user_id=1)
+
+        assert [(person.name, person.event_date) for person in saved] == [("Ann", "05-20"), ("Bob", "04-01")]
+        assert bulk.await_count == 2
+
+
+class TestCoordinatorNotifier:
+    """Test celebration delivery fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_direct_delivery_sends_concurrently_within_limit(self):
+        """Test that direct-to-contact sends overlap but never exceed the configured limit."""
+        user = User(
+            id=1,
+            username="coordinator",
+            full_name="Coordinator",
+            password_hash="x",
+            notification_preference=NotificationPreference.DIRECT_TO_CONTACTS,
+            created_at="2024-01-01T00:00:00",
+            updated_at="2024-01-01T00:00:00",
+        )
+        people = [
+            Person(id=i, owner_user_id=1, name=f"Person {i}", event_type=EventType.BIRTHDAY,
+                   event_date="03-15", created_at="2024-01-01T00:00:00", updated_at="2024-01-01T00:00:00")
+            for i in range(5)
+        ]
+        in_flight = 0
+        peak = 0
+
+        async def fake_send(_user, _person):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"success": True}
+
+        notifier = CoordinatorNotifier()
+        with patch("app.services.date_manager.get_todays_celebrations", AsyncMock(return_value=people)), \
+             patch.object(notifier, "send_direct_celebration_message", side_effect=fake_send), \
+             patch("app.services.settings.celebration_send_concurrency", 2):
+            result = await notifier.send_daily_celebrations_for_user(user)
+
+        assert result["sent_count"] == 5
+        assert peak == 2
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
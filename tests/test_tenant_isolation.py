@@ -20,16 +20,18 @@ layer.
 
 from __future__ import annotations
 
+import os
 from typing import Any, Dict, List, Optional
 from unittest.mock import AsyncMock
 
 import pytest
 from fastapi.testclient import TestClient
+from postgrest.types import ReturnMethod
 
 from app.auth import get_current_user
 from app.database import DatabaseManager
 from app.main import app
-from app.models import EventType, PersonCreate, PersonUpdate
+from app.models import AIWishAuditLogCreate, EventType, PersonCreate, PersonUpdate
 
 
 # ---------------------------------------------------------------------------
@@ -45,23 +47,25 @@ class _Query:
     Records filters and payloads so tests can assert on them.
 
     Only implements the chain methods DatabaseManager actually uses:
-    ``select``, ``insert``, ``update``, ``eq``, ``order``, ``range``, ``limit``,
-    ``execute``.
+    ``select``, ``insert``, ``update``, ``upsert``, ``eq``, ``in_``,
+    ``lt``, ``order``, ``range``, ``limit``, ``execute``.
     """
 
     def __init__(self, table: "_Table", op: str, payload: Any = None):
         self.table = table
         self.op = op
         self.payload = payload
+        self.options: Dict[str, Any] = {}
         self.filters: List[tuple] = []
 
     def select(self, *_args, **_kwargs):
         self.op = "select"
         return self
 
-    def insert(self, payload):
+    def insert(self, payload, **kwargs):
         self.op = "insert"
         self.payload = payload
+        self.options = kwargs
         return self
 
     def update(self, payload):
@@ -69,10 +73,24 @@ class _Query:
         self.payload = payload
         return self
 
+    def upsert(self, payload, **kwargs):
+        self.op = "upsert"
+        self.payload = payload
+        self.options = kwargs
+        return self
+
     def eq(self, column: str, value: Any):
         self.filters.append((column, value))
         return self
 
+    def in_(self, column: str, values: List[Any]):
+        self.filters.append((column, ("in", list(values))))
+        return self
+
+    def lt(self, column: str, value: Any):
+        self.filters.append((column, ("lt", value)))
+        return self
+
     def order(self, *_args, **_kwargs):
         return self
 
@@ -99,12 +117,15 @@ class _Table:
     def select(self, *args, **kwargs):
         return self._new_query().select(*args, **kwargs)
 
-    def insert(self, payload):
-        return self._new_query().insert(payload)
+    def insert(self, payload, **kwargs):
+        return self._new_query().insert(payload, **kwargs)
 
     def update(self, payload):
         return self._new_query().update(payload)
 
+    def upsert(self, payload, **kwargs):
+        return self._new_query().upsert(payload, **kwargs)
+
     def next_result(self, query: _Query) -> _Result:
         key = (self.name, query.op)
         responses = self.client.responses.get(key)
@@ -116,9 +137,36 @@ class _Table:
         return _Result([])
 
 
+class _RpcCall:
+    def __init__(self, client: "FakeSupabase", fn: str, params: Dict[str, Any]):
+        self.client = client
+        self.fn = fn
+        self.params = params
+
+    def execute(self):
+        self.client.rpc_calls.append(self)
+        return _Result(self.client.rpc_responses.get(self.fn, []))
+
+
+class _Session:
+    def __init__(self):
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _Postgrest:
+    def __init__(self):
+        self.session = _Session()
+
+
 class FakeSupabase:
     def __init__(self):
         self.tables: Dict[str, _Table] = {}
+        self.postgrest = _Postgrest()
+        self.rpc_calls: List[_RpcCall] = []
+        self.rpc_responses: Dict[str, List[Dict[str, Any]]] = {}
         # Keyed by (table_name, op) -> list of data payloads, returned in order.
         self.responses: Dict[tuple, List[List[Dict[str, Any]]]] = {}
 
@@ -127,6 +175,9 @@ class FakeSupabase:
             self.tables[name] = _Table(name, self)
         return self.tables[name]
 
+    def rpc(self, fn: str, params: Dict[str, Any]) -> _RpcCall:
+        return _RpcCall(self, fn, params)
+
     def set_response(self, table: str, op: str, rows: List[Dict[str, Any]]) -> None:
         self.responses[(table, op)] = [rows]
 
@@ -176,10 +227,20 @@ class TestPeopleTenancy:
         assert [p.owner_user_id for p in people] == [7]
         assert ("owner_user_id", 7) in fake.queries("people")[0].filters
 
+    @pytest.mark.asyncio
+    async def test_get_all_people_raw_filters_by_owner(self):
+        db, fake = _make_db()
+        fake.set_response("people", "select", [_person_row(7)])
+
+        rows = await db.get_all_people_raw(owner_user_id=7)
+
+        assert rows == [_person_row(7)]
+        assert ("owner_user_id", 7) in fake.queries("people")[0].filters
+
     @pytest.mark.asyncio
     async def test_create_person_stamps_owner(self):
         db, fake = _make_db()
-        fake.set_response("people", "insert", [_person_row(7)])
+        fake.set_response("people", "upsert", [_person_row(7)])
 
         person_data = PersonCreate(
             name="Alice",
@@ -190,9 +251,24 @@ class TestPeopleTenancy:
         person = await db.create_person(person_data, owner_user_id=7)
 
         assert person.owner_user_id == 7
-        insert_query = fake.queries("people")[0]
-        assert insert_query.op == "insert"
-        assert insert_query.payload["owner_user_id"] == 7
+        upsert_query = fake.queries("people")[0]
+        assert upsert_query.op == "upsert"
+        assert upsert_query.payload[0]["owner_user_id"] == 7
+
+    @pytest.mark.asyncio
+    async def test_create_person_reactivates_soft_deleted_row(self):
+        db, fake = _make_db()
+        fake.set_response("people", "upsert", [_person_row(7, person_id=4)])
+
+        person = await db.create_person(
+            PersonCreate(name="Alice", event_type=EventType.BIRTHDAY, event_date="03-15"),
+            owner_user_id=7,
+        )
+
+        assert person.id == 4
+        upsert_query = fake.queries("people")[0]
+        assert upsert_query.options["on_conflict"] == "owner_user_id,name,event_type"
+        assert upsert_query.payload[0]["active"] is True
 
     @pytest.mark.asyncio
     async def test_get_person_by_id_refuses_cross_tenant(self):
@@ -204,9 +280,83 @@ class TestPeopleTenancy:
 
         assert person is None
         select_query = fake.queries("people")[0]
-        assert ("id", 1) in select_query.filters
+        assert ("id", ("in", [1])) in select_query.filters
         assert ("owner_user_id", 9) in select_query.filters
 
+    @pytest.mark.asyncio
+    async def test_concurrent_person_lookups_share_one_query_per_owner(self):
+        import asyncio
+
+        db, fake = _make_db()
+        fake.set_response("people", "select", [_person_row(7, 1), _person_row(7, 2, name="Bob")])
+
+        first, second, missing = await asyncio.gather(
+            db.get_person_by_id(1, owner_user_id=7),
+            db.get_person_by_id(2, owner_user_id=7),
+            db.get_person_by_id(3, owner_user_id=7),
+        )
+
+        assert (first.id, second.name, missing) == (1, "Bob", None)
+        queries = fake.queries("people")
+        assert len(queries) == 1
+        assert ("owner_user_id", 7) in queries[0].filters
+        assert ("id", ("in", [1, 2, 3])) in queries[0].filters
+
+    @pytest.mark.asyncio
+    async def test_cached_person_is_not_shared_across_owners(self):
+        db, fake = _make_db()
+        fake.queue_responses("people", "select", [[_person_row(7)], []])
+
+        assert (await db.get_person_by_id(1, owner_user_id=7)).owner_user_id == 7
+        assert (await db.get_person_by_id(1, owner_user_id=7)).owner_user_id == 7
+        # Same id, different owner: must go back to the database, not the cache
+        assert await db.get_person_by_id(1, owner_user_id=9) is None
+        assert len(fake.queries("people")) == 2
+
+    @pytest.mark.asyncio
+    async def test_people_by_date_cache_is_dropped_on_mutation(self):
+        db, fake = _make_db()
+        fake.set_response("people", "select", [_person_row(7)])
+        fake.set_response("people", "update", [_person_row(7, active=False)])
+
+        await db.get_people_by_date("03-15", owner_user_id=7)
+        await db.get_people_by_date("03-15", owner_user_id=7)
+        await db.delete_person(1, owner_user_id=7)
+        await db.get_people_by_date("03-15", owner_user_id=7)
+
+        ops = [query.op for query in fake.queries("people")]
+        assert ops == ["select", "update", "select"]
+
+    @pytest.mark.asyncio
+    async def test_all_people_cache_is_dropped_on_upsert(self):
+        db, fake = _make_db()
+        fake.set_response("people", "select", [_person_row(7)])
+        fake.set_response("people", "upsert", [_person_row(7)])
+
+        await db.get_all_people(owner_user_id=7)
+        await db.get_all_people(owner_user_id=7)
+        await db.bulk_upsert_people(
+            [PersonCreate(name="Alice", event_type="birthday", event_date="03-15")],
+            owner_user_id=7,
+        )
+        await db.get_all_people(owner_user_id=7)
+
+        ops = [query.op for query in fake.queries("people")]
+        assert ops == ["select", "upsert", "select"]
+
+    @pytest.mark.asyncio
+    async def test_reads_are_not_cached_with_several_workers(self, monkeypatch):
+        monkeypatch.setattr("app.database.settings.web_concurrency", 3)
+        db, fake = _make_db()
+        fake.set_response("people", "select", [_person_row(7)])
+
+        await db.get_people_by_date("03-15", owner_user_id=7)
+        await db.get_people_by_date("03-15", owner_user_id=7)
+        await db.get_all_people_raw(owner_user_id=7)
+        await db.get_all_people_raw(owner_user_id=7)
+
+        assert len(fake.queries("people")) == 4
+
     @pytest.mark.asyncio
     async def test_update_person_requires_owner_match(self):
         db, fake = _make_db()
@@ -225,6 +375,16 @@ class TestPeopleTenancy:
         assert ("id", 1) in update_query.filters
         assert ("owner_user_id", 9) in update_query.filters
 
+    @pytest.mark.asyncio
+    async def test_update_person_returns_updated_row_in_one_request(self):
+        db, fake = _make_db()
+        fake.set_response("people", "update", [_person_row(9, name="Alicia")])
+
+        updated = await db.update_person(1, PersonUpdate(name="Alicia"), owner_user_id=9)
+
+        assert updated.name == "Alicia"
+        assert [query.op for query in fake.queries("people")] == ["update"]
+
     @pytest.mark.asyncio
     async def test_delete_person_requires_owner_match(self):
         db, fake = _make_db()
@@ -240,14 +400,11 @@ class TestPeopleTenancy:
         """
         Two users upserting "Alice / birthday" must not clobber each other.
 
-        Verified by the existence check filtering on ``owner_user_id`` before
-        falling through to insert.
+        Verified by the upsert row carrying ``owner_user_id`` and the conflict
+        target including it, so user 7's row can never match.
         """
         db, fake = _make_db()
-        # First call (existence check) returns nothing: we should fall through
-        # to an insert, not an update of user 7's row.
-        fake.queue_responses("people", "select", [[]])
-        fake.queue_responses("people", "insert", [[_person_row(9)]])
+        fake.set_response("people", "upsert", [_person_row(9)])
 
         person_data = PersonCreate(
             name="Alice",
@@ -258,9 +415,61 @@ class TestPeopleTenancy:
         person = await db.upsert_person(person_data, owner_user_id=9)
 
         assert person.owner_user_id == 9
-        select_query = fake.queries("people")[0]
-        assert ("owner_user_id", 9) in select_query.filters
-        assert ("name", "Alice") in select_query.filters
+        upsert_query = fake.queries("people")[0]
+        assert upsert_query.payload[0]["owner_user_id"] == 9
+        assert upsert_query.payload[0]["name"] == "Alice"
+        assert upsert_query.options["on_conflict"] == "owner_user_id,name,event_type"
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_people_stamps_owner_in_one_request(self):
+        db, fake = _make_db()
+        fake.set_response("people", "upsert", [_person_row(9, 1), _person_row(9, 2, name="Bob")])
+
+        people = [
+            PersonCreate(name="Alice", event_type=EventType.BIRTHDAY, event_date="03-15"),
+            PersonCreate(name="Bob", event_type=EventType.BIRTHDAY, event_date="04-01"),
+            # Repeated key: only the last occurrence should be sent.
+            PersonCreate(name="Alice", event_type=EventType.BIRTHDAY, event_date="03-16"),
+        ]
+        result = await db.bulk_upsert_people(people, owner_user_id=9)
+
+        assert len(result) == 2
+        queries = fake.queries("people")
+        assert len(queries) == 1
+        rows = queries[0].payload
+        assert [row["name"] for row in rows] == ["Alice", "Bob"]
+        assert rows[0]["event_date"] == "03-16"
+        assert all(row["owner_user_id"] == 9 for row in rows)
+
+
+# ---------------------------------------------------------------------------
+# DatabaseManager: health ping
+# ---------------------------------------------------------------------------
+class TestHealthPing:
+    @pytest.mark.asyncio
+    async def test_successful_ping_is_reused(self):
+        db, fake = _make_db()
+
+        await db.ping()
+        await db.ping()
+
+        assert len(fake.queries("users")) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_ping_is_not_cached(self, monkeypatch):
+        db, fake = _make_db()
+        attempts = []
+
+        async def failing_execute(query):
+            attempts.append(query)
+            raise Exception("connection refused")
+
+        monkeypatch.setattr(db, "_execute", failing_execute)
+        for _ in range(2):
+            with pytest.raises(Exception):
+                await db.ping()
+
+        assert len(attempts) == 2
 
 
 # ---------------------------------------------------------------------------
@@ -285,15 +494,82 @@ class TestMessageLogTenancy:
         insert_query = fake.queries("message_logs")[0]
         assert insert_query.op == "insert"
         assert insert_query.payload["owner_user_id"] == 7
+        # Nothing reads the inserted row back, so don't ask PostgREST for it
+        assert insert_query.options["returning"] == ReturnMethod.minimal
+
+    @pytest.mark.asyncio
+    async def test_queued_message_logs_are_inserted_in_one_batch(self):
+        from datetime import date as date_type
+
+        db, fake = _make_db()
+        db.start()
+        for person_id, owner in ((1, 7), (2, 9)):
+            await db.log_message(
+                person_id=person_id,
+                message_content="hi",
+                sent_date=date_type(2026, 1, 1),
+                success=True,
+                owner_user_id=owner,
+            )
+        await db.aclose()
+
+        queries = fake.queries("message_logs")
+        assert len(queries) == 1
+        assert [row["owner_user_id"] for row in queries[0].payload] == [7, 9]
+        assert fake.postgrest.session.closed
+
+    @pytest.mark.asyncio
+    async def test_bulk_message_logs_are_inserted_in_one_request_without_writer(self):
+        from datetime import date as date_type
+
+        db, fake = _make_db()
+        await db.log_messages_bulk(
+            [
+                {"person_id": person_id, "message_content": "hi", "sent_date": date_type(2026, 1, 1), "success": True}
+                for person_id in (1, 2, 3)
+            ],
+            owner_user_id=7,
+        )
+
+        queries = fake.queries("message_logs")
+        assert len(queries) == 1
+        assert [row["person_id"] for row in queries[0].payload] == [1, 2, 3]
+        assert {row["owner_user_id"] for row in queries[0].payload} == {7}
 
     @pytest.mark.asyncio
     async def test_get_all_message_logs_filters_by_owner(self):
         db, fake = _make_db()
-        fake.set_response("message_logs", "select", [])
+        fake.rpc_responses["get_message_logs"] = [{"id": 3, "person_name": "Alice"}]
 
-        await db.get_all_message_logs(owner_user_id=7)
+        rows, next_before_id = await db.get_all_message_logs(owner_user_id=7)
 
-        assert ("owner_user_id", 7) in fake.queries("message_logs")[0].filters
+        assert rows == [{"id": 3, "person_name": "Alice"}]
+        assert next_before_id is None
+        call = fake.rpc_calls[0]
+        assert call.fn == "get_message_logs"
+        assert call.params["p_owner_user_id"] == 7
+
+    @pytest.mark.asyncio
+    async def test_message_log_pages_stay_scoped_to_owner(self):
+        db, fake = _make_db()
+
+        await db.get_all_message_logs(limit=50, before_id=120, owner_user_id=7)
+
+        assert fake.rpc_calls[0].params == {
+            "p_owner_user_id": 7,
+            "p_before_id": 120,
+            "p_limit": 50,
+        }
+
+    @pytest.mark.asyncio
+    async def test_full_message_log_page_returns_next_cursor(self):
+        db, fake = _make_db()
+        fake.rpc_responses["get_message_logs"] = [{"id": 9}, {"id": 8}]
+
+        rows, next_before_id = await db.get_all_message_logs(limit=2, owner_user_id=7)
+
+        assert [row["id"] for row in rows] == [9, 8]
+        assert next_before_id == 8
 
     @pytest.mark.asyncio
     async def test_get_message_log_by_id_refuses_cross_tenant(self):
@@ -331,14 +607,29 @@ class TestCSVUploadTenancy:
         assert q.payload["owner_user_id"] == 7
 
     @pytest.mark.asyncio
-    async def test_get_csv_upload_history_filters_by_owner(self):
+    async def test_iter_csv_upload_history_filters_by_owner(self):
         db, fake = _make_db()
         fake.set_response("csv_uploads", "select", [])
 
-        await db.get_csv_upload_history(owner_user_id=7)
+        rows = [row async for row in db.iter_csv_upload_history(owner_user_id=7)]
 
+        assert rows == []
         assert ("owner_user_id", 7) in fake.queries("csv_uploads")[0].filters
 
+    @pytest.mark.asyncio
+    async def test_csv_upload_history_pages_until_short_page(self):
+        db, fake = _make_db()
+        fake.queue_responses(
+            "csv_uploads",
+            "select",
+            [[{"id": 3}, {"id": 2}], [{"id": 1}]],
+        )
+
+        rows = [row async for row in db.iter_csv_upload_history(page_size=2, owner_user_id=7)]
+
+        assert [row["id"] for row in rows] == [3, 2, 1]
+        assert len(fake.queries("csv_uploads")) == 2
+
 
 # ---------------------------------------------------------------------------
 # DatabaseManager: AI wish audit logs
@@ -353,6 +644,29 @@ class TestAIWishAuditLogTenancy:
 
         assert ("owner_user_id", 7) in fake.queries("ai_wish_audit_logs")[0].filters
 
+    @pytest.mark.asyncio
+    async def test_bulk_audit_log_insert_keeps_each_owner(self):
+        db, fake = _make_db()
+        fake.set_response("ai_wish_audit_logs", "insert", [])
+
+        entries = [
+            AIWishAuditLogCreate(
+                owner_user_id=owner,
+                request_id=f"req-{owner}",
+                ip_address="abc",
+                request_data={},
+                response_data={"generated_wish": "hi"},
+                ai_service_used="groq",
+            )
+            for owner in (7, None)
+        ]
+        written = await db.bulk_log_ai_wish_requests(entries)
+
+        assert written == 2
+        q = fake.queries("ai_wish_audit_logs")[0]
+        assert q.op == "insert"
+        assert [row["owner_user_id"] for row in q.payload] == [7, None]
+
     @pytest.mark.asyncio
     async def test_audit_log_by_request_id_scopes_to_owner_when_provided(self):
         db, fake = _make_db()
@@ -415,14 +729,14 @@ class TestAPIForwardsCallerId:
     def test_get_people_forwards_owner(self, monkeypatch, user_id):
         captured: Dict[str, Any] = {}
 
-        async def fake_get_all_people(*, owner_user_id: int):
+        async def fake_get_all_people_raw(*, owner_user_id: int):
             captured["owner"] = owner_user_id
             return []
 
         monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
         monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
         monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
-        monkeypatch.setattr("app.main.db_manager.get_all_people", fake_get_all_people)
+        monkeypatch.setattr("app.main.db_manager.get_all_people_raw", fake_get_all_people_raw)
 
         self._override_user(user_id)
         with TestClient(app) as client:
@@ -431,6 +745,147 @@ class TestAPIForwardsCallerId:
         assert response.status_code == 200
         assert captured["owner"] == user_id
 
+    def test_get_people_returns_304_for_matching_etag(self, monkeypatch):
+        rows = [{"id": 1, "name": "Ada", "event_type": "birthday", "event_date": "03-15"}]
+
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
+        monkeypatch.setattr("app.main.db_manager.get_all_people_raw", AsyncMock(return_value=rows))
+
+        self._override_user(7)
+        with TestClient(app) as client:
+            first = client.get("/people")
+            etag = first.headers["etag"]
+            cached = client.get("/people", headers={"If-None-Match": etag})
+            rows.append({"id": 2, "name": "Ben", "event_type": "birthday", "event_date": "04-01"})
+            changed = client.get("/people", headers={"If-None-Match": etag})
+
+        assert first.status_code == 200
+        assert first.json() == rows[:1]
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    @pytest.mark.parametrize("if_none_match", [
+        "{etag}",
+        "W/{etag}",
+        '"stale", {etag}',
+        '"stale",W/{etag} , "older"',
+        "*",
+    ])
+    def test_get_people_if_none_match_forms(self, monkeypatch, if_none_match):
+        rows = [{"id": 1, "name": "Ada", "event_type": "birthday", "event_date": "03-15"}]
+
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
+        monkeypatch.setattr("app.main.db_manager.get_all_people_raw", AsyncMock(return_value=rows))
+
+        self._override_user(7)
+        with TestClient(app) as client:
+            first = client.get("/people")
+            etag = first.headers["etag"]
+            cached = client.get("/people", headers={"If-None-Match": if_none_match.format(etag=etag)})
+            stale = client.get("/people", headers={"If-None-Match": '"stale", W/"older"'})
+
+        assert etag.startswith('"') and etag.endswith('"')
+        assert first.headers["cache-control"] == "private, must-revalidate"
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert stale.status_code == 200
+
+    @pytest.mark.parametrize("date_str", ["13-01", "02-32", "00-10", "3-15", "03-15x"])
+    def test_celebrations_rejects_invalid_dates_without_querying(self, monkeypatch, date_str):
+        fake_get_people_by_date = AsyncMock(return_value=[])
+
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
+        monkeypatch.setattr("app.main.db_manager.get_people_by_date", fake_get_people_by_date)
+
+        self._override_user(7)
+        with TestClient(app) as client:
+            response = client.get(f"/celebrations/{date_str}")
+
+        assert response.status_code == 400
+        fake_get_people_by_date.assert_not_awaited()
+
+    @pytest.mark.parametrize("user_id", [7, 9])
+    def test_upload_csv_streams_file_under_owner(self, monkeypatch, user_id):
+        captured: Dict[str, Any] = {}
+
+        async def fake_upload_csv_file(file_content, filename, *, owner_user_id: int):
+            captured["owner"] = owner_user_id
+            captured["content"] = file_content.read()
+            captured["path"] = file_content.name
+            return {"success": False, "error": "stop here"}
+
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
+        monkeypatch.setattr("app.main.storage_manager.upload_csv_file", fake_upload_csv_file)
+
+        self._override_user(user_id)
+        with TestClient(app) as client:
+            response = client.post(
+                "/upload-csv",
+                files={"file": ("people.csv", b"name,type,date\nAnn,birthday,03-15\n", "text/csv")},
+            )
+
+        assert response.status_code == 500
+        assert captured["owner"] == user_id
+        assert captured["content"] == b"name,type,date\nAnn,birthday,03-15\n"
+        assert not os.path.exists(captured["path"])
+
+    def test_upload_csv_processes_spooled_copy_without_download(self, monkeypatch):
+        captured: Dict[str, Any] = {}
+
+        async def fake_process_csv_file(file_path, *, owner_user_id: int, local_path=None):
+            with open(local_path, "rb") as spooled:
+                captured["content"] = spooled.read()
+            captured["file_path"] = file_path
+            captured["local_path"] = local_path
+            return {"success": True}
+
+        download = AsyncMock()
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
+        monkeypatch.setattr(
+            "app.main.storage_manager.upload_csv_file",
+            AsyncMock(return_value={"success": True, "file_path": "uploads/7/people.csv"}),
+        )
+        monkeypatch.setattr("app.main.storage_manager.download_csv_file", download)
+        monkeypatch.setattr("app.main.csv_manager.process_csv_file", fake_process_csv_file)
+
+        self._override_user(7)
+        with TestClient(app) as client:
+            response = client.post("/upload-csv", files={"file": ("people.csv", b"name,type,date\n", "text/csv")})
+
+        assert response.status_code == 200
+        assert captured["file_path"] == "uploads/7/people.csv"
+        assert captured["content"] == b"name,type,date\n"
+        assert not os.path.exists(captured["local_path"])
+        download.assert_not_awaited()
+
+    def test_upload_csv_rejects_oversized_file(self, monkeypatch):
+        fake_upload_csv_file = AsyncMock()
+
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
+        monkeypatch.setattr("app.main.storage_manager.upload_csv_file", fake_upload_csv_file)
+        monkeypatch.setattr("app.main.settings.csv_max_upload_bytes", 10)
+
+        self._override_user(7)
+        with TestClient(app) as client:
+            response = client.post("/upload-csv", files={"file": ("people.csv", b"x" * 11, "text/csv")})
+
+        assert response.status_code == 413
+        fake_upload_csv_file.assert_not_awaited()
+
     @pytest.mark.parametrize("user_id", [7, 9])
     def test_get_person_by_id_forwards_owner(self, monkeypatch, user_id):
         captured: Dict[str, Any] = {}
@@ -456,9 +911,9 @@ class TestAPIForwardsCallerId:
     def test_messages_forward_owner(self, monkeypatch, user_id):
         captured: Dict[str, Any] = {}
 
-        async def fake_get_all_message_logs(*, owner_user_id: int):
+        async def fake_get_all_message_logs(limit: int = 200, before_id: Optional[int] = None, *, owner_user_id: int):
             captured["owner"] = owner_user_id
-            return []
+            return [], None
 
         monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
         monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
@@ -472,24 +927,71 @@ class TestAPIForwardsCallerId:
         assert response.status_code == 200
         assert captured["owner"] == user_id
 
+    def test_messages_page_through_with_before_id(self, monkeypatch):
+        logs = [{"id": log_id, "message_content": f"Message {log_id}"} for log_id in range(5, 0, -1)]
+        calls: List[tuple] = []
+
+        async def fake_get_all_message_logs(limit: int = 200, before_id: Optional[int] = None, *, owner_user_id: int):
+            calls.append((limit, before_id))
+            remaining = [log for log in logs if before_id is None or log["id"] < before_id]
+            page = remaining[:limit]
+            return page, (page[-1]["id"] if len(page) == limit else None)
+
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
+        monkeypatch.setattr("app.main.db_manager.get_all_message_logs", fake_get_all_message_logs)
+
+        self._override_user(7)
+        seen: List[int] = []
+        before_id = None
+        with TestClient(app) as client:
+            while True:
+                params = {"limit": 2} if before_id is None else {"limit": 2, "before_id": before_id}
+                body = client.get("/messages", params=params).json()
+                seen.extend(log["id"] for log in body["items"])
+                before_id = body["next_before_id"]
+                if before_id is None:
+                    break
+
+        assert seen == [5, 4, 3, 2, 1]
+        assert calls == [(2, None), (2, 4), (2, 2)]
+
+    @pytest.mark.parametrize("params", [{"limit": 0}, {"limit": -5}, {"limit": 1001}, {"before_id": 0}])
+    def test_messages_rejects_out_of_range_paging(self, monkeypatch, params):
+        fake_get_all_message_logs = AsyncMock(return_value=([], None))
+
+        monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
+        monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
+        monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
+        monkeypatch.setattr("app.main.db_manager.get_all_message_logs", fake_get_all_message_logs)
+
+        self._override_user(7)
+        with TestClient(app) as client:
+            response = client.get("/messages", params=params)
+
+        assert response.status_code == 422
+        fake_get_all_message_logs.assert_not_awaited()
+
     @pytest.mark.parametrize("user_id", [7, 9])
     def test_csv_uploads_forward_owner(self, monkeypatch, user_id):
         captured: Dict[str, Any] = {}
 
-        async def fake_get_csv_upload_history(*, owner_user_id: int):
+        async def fake_iter_csv_upload_history(page_size: int = 100, *, owner_user_id: int):
             captured["owner"] = owner_user_id
-            return []
+            yield {"id": 1, "filename": "people.csv"}
 
         monkeypatch.setattr("app.main.celebration_scheduler.start", lambda: None)
         monkeypatch.setattr("app.main.celebration_scheduler.stop", lambda: None)
         monkeypatch.setattr("app.main.db_manager.initialize_tables", AsyncMock(return_value=None))
-        monkeypatch.setattr("app.main.db_manager.get_csv_upload_history", fake_get_csv_upload_history)
+        monkeypatch.setattr("app.main.db_manager.iter_csv_upload_history", fake_iter_csv_upload_history)
 
         self._override_user(user_id)
         with TestClient(app) as client:
             response = client.get("/csv-uploads")
 
         assert response.status_code == 200
+        assert response.json() == [{"id": 1, "filename": "people.csv"}]
         assert captured["owner"] == user_id
 
     @pytest.mark.parametrize("user_id", [7, 9])